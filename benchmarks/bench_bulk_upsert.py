@@ -0,0 +1,90 @@
+"""Compare per-row SQLite writes with the bulk upsert path used by job card sync.
+
+Run from the project root:  python benchmarks/bench_bulk_upsert.py [rows]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_db import bulk_upsert, enable_wal  # noqa: E402
+
+JOB_CARD_COLUMNS = [
+    "id", "job_number", "title", "description", "status", "created_date", "started_date",
+    "completed_date", "entity_type", "entity_id", "closure_details", "department_name"
+]
+
+
+def create_schema(conn):
+    conn.execute("""
+        CREATE TABLE job_cards (
+            id INTEGER PRIMARY KEY,
+            job_number TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            started_date TEXT,
+            completed_date TEXT,
+            entity_type TEXT,
+            entity_id INTEGER,
+            closure_details TEXT,
+            department_name TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def make_rows(count):
+    return [
+        (
+            i, f"IT20250101-{i:06d}", f"Job {i}", "Replace toner and test print", "Open",
+            "2025-01-01 09:00:00", None, None, "Asset", i % 500, None, "IT"
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def per_row_commit(conn, rows):
+    """The previous sync loop: existence check, UPDATE or INSERT, commit per row."""
+    cursor = conn.cursor()
+    for values in rows:
+        cursor.execute("SELECT id FROM job_cards WHERE id = ?", (values[0],))
+        if cursor.fetchone():
+            cursor.execute("""
+                UPDATE job_cards
+                SET job_number = ?, title = ?, description = ?, status = ?, created_date = ?,
+                    started_date = ?, completed_date = ?, entity_type = ?, entity_id = ?,
+                    closure_details = ?, department_name = ?
+                WHERE id = ?
+            """, values[1:] + (values[0],))
+        else:
+            cursor.execute(f"INSERT INTO job_cards VALUES ({', '.join(['?'] * len(values))})", values)
+        conn.commit()
+
+
+def run(label, rows, write, wal):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        if wal:
+            enable_wal(conn)
+        create_schema(conn)
+        start = time.perf_counter()
+        write(conn, rows)
+        elapsed = time.perf_counter() - start
+        conn.close()
+    print(f"{label:<36} {len(rows):>7} rows  {elapsed:8.3f} s  {len(rows) / elapsed:>12,.0f} rows/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = make_rows(count)
+    run("per-row commit (rollback journal)", rows, per_row_commit, wal=False)
+    run("bulk upsert (WAL)", rows, lambda conn, rows: bulk_upsert(conn, "job_cards", JOB_CARD_COLUMNS, rows), wal=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time job card search as it runs while typing, against a scratch database of generated cards.
+
+Builds the app's schema (including the FTS5 index and its triggers), inserts the cards through
+the triggers, then runs each prefix of the search words through JobCardPage.read_job_cards.
+
+Run from the project root:  python benchmarks/bench_job_card_search.py [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Keep the scratch database out of the project folder; must be set before local_db is imported
+os.environ["FLET_APP_STORAGE_DATA"] = tempfile.mkdtemp()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_db import get_sqlite_connection, has_job_card_search, migrate_database  # noqa: E402
+from jobcard_client import JobCardPage  # noqa: E402
+
+WORDS = [
+    "printer", "jam", "tray", "network", "switch", "cable", "laptop", "screen", "battery", "keyboard",
+    "replace", "broken", "slow", "router", "firewall", "password", "reset", "scanner", "toner", "server"
+]
+SEARCHES = ["printer jam", "IT2025", "toner replace", "network switch cable"]
+
+
+def populate(conn, rows):
+    random.seed(1)
+    conn.execute("INSERT OR IGNORE INTO department (id, name) VALUES (9001, 'IT')")
+    with conn:
+        conn.executemany("""
+            INSERT INTO job_cards (id, job_number, title, description, status, created_date, department_name, closure_details)
+            VALUES (?, ?, ?, ?, ?, ?, 'IT', ?)
+        """, [
+            (
+                100000 + i,
+                f"IT2025{i // 100 % 12 + 1:02d}{i % 28 + 1:02d}-{i:05d}",
+                " ".join(random.sample(WORDS, 3)),
+                " ".join(random.choices(WORDS, k=25)),
+                random.choice(["Open", "Started", "Completed"]),
+                f"2025-{i // 100 % 12 + 1:02d}-{i % 28 + 1:02d} 09:00:00",
+                " ".join(random.choices(WORDS, k=5)) if i % 3 == 0 else None,
+            )
+            for i in range(rows)
+        ])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    migrate_database()
+    conn = get_sqlite_connection()
+    print(f"FTS5 index: {'yes' if has_job_card_search(conn) else 'no (LIKE fallback)'}")
+    started = time.perf_counter()
+    populate(conn, rows)
+    print(f"inserted {rows} cards through the triggers in {time.perf_counter() - started:.2f}s")
+
+    # read_job_cards only needs the department and the entity cache TTL from the page
+    page = SimpleNamespace(user_department="IT", entity_cache_ttl=3600)
+    slowest = 0.0
+    for search in SEARCHES:
+        timings = []
+        for end in range(1, len(search) + 1):
+            started = time.perf_counter()
+            job_cards, has_more, _ = JobCardPage.read_job_cards(page, None, None, 50, search[:end])
+            timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        more, _, _ = JobCardPage.read_job_cards(page, None, len(job_cards), 50, search)
+        next_page_ms = (time.perf_counter() - started) * 1000
+        slowest = max(slowest, *timings, next_page_ms)
+        print(f"{search!r}: {len(job_cards)} shown, more={has_more}, per keystroke max {max(timings):.1f} ms, "
+              f"avg {sum(timings) / len(timings):.1f} ms, next page {next_page_ms:.1f} ms")
+    print(f"slowest query: {slowest:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
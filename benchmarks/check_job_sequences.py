@@ -0,0 +1,250 @@
+"""Run many simulated handsets creating job cards at once and check that no job number is handed out twice.
+
+The SQLite runs only illustrate the idea: they compare the old MAX()+1 lookup with a counter
+reimplemented in SQLite, and prove nothing about job_sequences.py. Verifying the shipped
+LAST_INSERT_ID(expr) statement and the seeding in ensure_job_sequences needs MySQL: point
+JOBCARD_TEST_MYSQL_HOST, JOBCARD_TEST_MYSQL_DATABASE, JOBCARD_TEST_MYSQL_USER and
+JOBCARD_TEST_MYSQL_PASSWORD (optionally JOBCARD_TEST_MYSQL_PORT) at a scratch database. It drops and
+reseeds job_sequences there, so it refuses to run against the server in db.DB_CONFIG. Without those
+variables the script reports job_sequences.py as not verified.
+
+Run from the project root:  python benchmarks/check_job_sequences.py [clients] [cards_per_client]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PREFIX = "ZZTEST"
+DAY = "20250101"
+ROUND_TRIP = 0.002  # Simulated network latency between a handset and the server
+SEEDED_SEQUENCE = 41  # Existing ZZTEST card the MySQL run seeds the counter from
+
+
+def create_schema(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE job_cards (id INTEGER PRIMARY KEY AUTOINCREMENT, job_number TEXT NOT NULL UNIQUE)")
+    conn.execute("""
+        CREATE TABLE job_sequences (
+            department TEXT NOT NULL,
+            day TEXT NOT NULL,
+            next_value INTEGER NOT NULL,
+            PRIMARY KEY (department, day)
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def legacy_client(path, cards, results):
+    """Old flow: read MAX(sequence), check for a collision, insert; retry on a duplicate."""
+    conn = sqlite3.connect(path, timeout=30)
+    start = len(PREFIX) + 10
+    for _ in range(cards):
+        for attempt in range(10):
+            time.sleep(ROUND_TRIP)
+            sequence = conn.execute(
+                "SELECT COALESCE(MAX(CAST(SUBSTR(job_number, ?) AS INTEGER)), 0) + 1 FROM job_cards WHERE job_number LIKE ?",
+                (start, f"{PREFIX}{DAY}-%")
+            ).fetchone()[0]
+            time.sleep(ROUND_TRIP)
+            try:
+                conn.execute("INSERT INTO job_cards (job_number) VALUES (?)", (f"{PREFIX}{DAY}-{sequence:04d}",))
+                conn.commit()
+                results["round_trips"] += 2
+                break
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                results["round_trips"] += 2
+                results["retries"] += 1
+        else:
+            results["failed"] += 1
+    conn.close()
+
+
+def counter_client(path, cards, results):
+    """New flow: one atomic counter statement, then the insert in the same transaction."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    for _ in range(cards):
+        time.sleep(ROUND_TRIP)
+        conn.execute("BEGIN IMMEDIATE")
+        # SQLite stand-in for INSERT ... ON DUPLICATE KEY UPDATE next_value = LAST_INSERT_ID(next_value) + 1
+        sequence = conn.execute("""
+            INSERT INTO job_sequences (department, day, next_value) VALUES (?, ?, 2)
+            ON CONFLICT(department, day) DO UPDATE SET next_value = next_value + 1
+            RETURNING next_value - 1
+        """, (PREFIX, DAY)).fetchone()[0]
+        try:
+            conn.execute("INSERT INTO job_cards (job_number) VALUES (?)", (f"{PREFIX}{DAY}-{sequence:04d}",))
+            conn.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK")
+            results["failed"] += 1
+        results["round_trips"] += 1
+    conn.close()
+
+
+def test_mysql_config():
+    """Connection settings for the scratch MySQL database, or None when they aren't set."""
+    host = os.getenv("JOBCARD_TEST_MYSQL_HOST")
+    database = os.getenv("JOBCARD_TEST_MYSQL_DATABASE")
+    if not host or not database:
+        return None
+    # db imports the MySQL driver, which the SQLite illustration doesn't need
+    from db import DB_CONFIG
+
+    if host == DB_CONFIG["host"] or database == DB_CONFIG["database"]:
+        sys.exit("Refusing to run against the production server or database from db.DB_CONFIG.")
+    return {
+        "host": host,
+        "port": int(os.getenv("JOBCARD_TEST_MYSQL_PORT", "3306")),
+        "user": os.getenv("JOBCARD_TEST_MYSQL_USER", ""),
+        "password": os.getenv("JOBCARD_TEST_MYSQL_PASSWORD", ""),
+        "database": database,
+        "connection_timeout": 5,
+    }
+
+
+def prepare_mysql(config):
+    """Drop the counter table and leave one ZZTEST card behind so ensure_job_sequences has to seed from it."""
+    import mysql.connector
+
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CREATE TABLE IF NOT EXISTS job_cards (id BIGINT PRIMARY KEY, job_number VARCHAR(30) NOT NULL UNIQUE)")
+        cursor.execute("DELETE FROM job_cards WHERE job_number LIKE %s", (f"{PREFIX}%",))
+        cursor.execute(
+            "INSERT INTO job_cards (id, job_number) VALUES (%s, %s)",
+            (int(f"9{DAY}{SEEDED_SEQUENCE:04d}"), f"{PREFIX}{DAY}-{SEEDED_SEQUENCE:04d}")
+        )
+        cursor.execute("DROP TABLE IF EXISTS job_sequences")
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cleanup_mysql(config):
+    import mysql.connector
+
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM job_cards WHERE job_number LIKE %s", (f"{PREFIX}%",))
+        cursor.execute("DELETE FROM job_sequences WHERE department = %s", (PREFIX,))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def mysql_client(config, cards, blocks, lock, results):
+    """Real reserve_job_sequences against the scratch database, in blocks of 1 to 3 numbers."""
+    import mysql.connector
+    from job_sequences import reserve_job_sequences
+
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    for i in range(cards):
+        count = i % 3 + 1
+        start = reserve_job_sequences(cursor, PREFIX, DAY, count)
+        conn.commit()
+        with lock:
+            blocks.append((start, count))
+        results["round_trips"] += 2
+    cursor.close()
+    conn.close()
+
+
+def check_mysql(config, clients, cards):
+    """Seed the counter through ensure_job_sequences, then check concurrent reservations never overlap."""
+    import mysql.connector
+    import job_sequences
+
+    prepare_mysql(config)
+    try:
+        # The first connection to reach ensure_job_sequences creates and seeds the table
+        job_sequences._job_sequences_ready = False
+        conn = mysql.connector.connect(**config)
+        cursor = conn.cursor()
+        try:
+            first = job_sequences.reserve_job_sequences(cursor, PREFIX, DAY, 1)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        seeded = first == SEEDED_SEQUENCE + 1
+        print(f"           first reservation {first}, expected {SEEDED_SEQUENCE + 1}: {'ok' if seeded else 'FAIL'}")
+
+        blocks = []
+        run("mysql", mysql_client, clients, (config, cards, blocks, threading.Lock()))
+        numbers = sorted(number for start, count in blocks for number in range(start, start + count))
+        expected = list(range(first + 1, first + 1 + sum(count for _, count in blocks)))
+        ok = numbers == expected
+        print(f"           {len(blocks)} reservations, {len(numbers)} numbers, disjoint and contiguous: {'ok' if ok else 'FAIL'}")
+        return seeded and ok
+    finally:
+        cleanup_mysql(config)
+
+
+def run(name, target, clients, args):
+    results = {"round_trips": 0, "retries": 0, "failed": 0}
+    threads = [threading.Thread(target=target, args=args + (results,)) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {elapsed:7.2f} s  round trips {results['round_trips']:6}  "
+        f"retries {results['retries']:5}  failed {results['failed']:4}"
+    )
+    return results
+
+
+def check_unique(path, expected):
+    conn = sqlite3.connect(path)
+    total, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT job_number) FROM job_cards").fetchone()
+    conn.close()
+    ok = total == distinct == expected
+    print(f"           {total} cards, {distinct} distinct job numbers, expected {expected}: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    cards = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    config = test_mysql_config()
+    print(f"{clients} clients x {cards} cards")
+    print("SQLite illustration (a stand-in counter, not job_sequences.py):")
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        create_schema(legacy_path)
+        legacy = run("MAX()+1", legacy_client, clients, (legacy_path, cards))
+        check_unique(legacy_path, clients * cards - legacy["failed"])
+
+        counter_path = os.path.join(tmp, "counter.db")
+        create_schema(counter_path)
+        counter = run("counter", counter_client, clients, (counter_path, cards))
+        ok &= counter["failed"] == 0 and check_unique(counter_path, clients * cards)
+
+    if config:
+        ok &= check_mysql(config, clients, cards)
+    else:
+        print("mysql      job_sequences.py NOT verified: set JOBCARD_TEST_MYSQL_HOST and JOBCARD_TEST_MYSQL_DATABASE "
+              "to a scratch database")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Open and close the job card dialogs many times, rebuilding the pages as navigation does, and check
+that page.overlay stays the same size.
+
+Run from the project root:  python benchmarks/check_overlay_growth.py [cycles]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+
+# Keep the scratch database out of the project folder; must be set before local_db is imported
+os.environ["FLET_APP_STORAGE_DATA"] = tempfile.mkdtemp()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connectivity  # noqa: E402
+import outbox  # noqa: E402
+from flet_audio import Audio  # noqa: E402
+from local_db import migrate_database  # noqa: E402
+from jobcard_client import JobCardPage  # noqa: E402
+from login import login_page  # noqa: E402
+
+JOB_CARD = {
+    "id": 1, "job_number": "IT20250101-0001", "title": "Printer jam", "description": "Tray 2 jams on every job",
+    "status": "Open", "created_date": "2025-01-01 09:00:00", "started_date": None, "completed_date": None,
+    "department_name": "IT", "entity_info": "N/A", "closure_details": None
+}
+
+
+class StubPage:
+    """Just enough of ft.Page for the pages to build and toggle their overlays without a Flet client."""
+
+    def __init__(self):
+        self.overlay = []
+        self.controls = []
+        self.views = []
+        self.window = SimpleNamespace()
+        self.title = ""
+        self.session = SimpleNamespace(values={"user": {"emp_id": "1", "department_name": "IT"}})
+        self.session.get = self.session.values.get
+        self.session.set = self.session.values.__setitem__
+        self.updates = 0
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def run_task(self, handler, *args):
+        # Background loads need a database server; only the overlay lifecycle is under test
+        handler(*args).close()
+
+    def go(self, route):
+        pass
+
+
+def count_audio_calls(audio, name, arguments=None, **kwargs):
+    """Stand-in for Audio.invoke_method, which needs a connected client."""
+    audio_calls[name] = audio_calls.get(name, 0) + 1
+
+
+audio_calls = {}
+Audio.invoke_method = count_audio_calls
+
+# Pages fetch the shared monitor and uploader, which start threads that probe and upload to the
+# configured server. Install never-started ones first; the monitor points at an unroutable
+# TEST-NET address (RFC 5737) and reports offline, so nothing here can reach a real host.
+connectivity._monitor = connectivity.ConnectivityMonitor("192.0.2.1", 3306)
+connectivity._monitor.set_state(False)
+outbox._uploader = outbox.OutboxUploader()
+BACKGROUND_THREADS = {"connectivity-monitor", "outbox-uploader"}
+
+
+async def run(cycles):
+    page = StubPage()
+    job_card_page = JobCardPage(page)
+    sizes = set()
+    for cycle in range(cycles):
+        if cycle % 100 == 0:
+            # Navigating back to the job card page builds a fresh JobCardPage (and login page)
+            login_page(page)
+            page.session.set("user", {"emp_id": "1", "department_name": "IT"})
+            job_card_page = JobCardPage(page)
+        await job_card_page.open_job_card_dialog()
+        await job_card_page.close_dialog(None)
+        await job_card_page.show_job_card_detail(JOB_CARD)
+        await job_card_page.close_dialog(None)
+        job_card_page.show_snack_bar(f"Cycle {cycle}")
+        job_card_page.play_beep()
+        sizes.add(len(page.overlay))
+    return sizes, page
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    migrate_database()
+    sizes, page = asyncio.run(run(cycles))
+    print(f"{cycles} open/close cycles: overlay size(s) seen {sorted(sizes)}, {page.updates} page updates")
+    print("overlay:", ", ".join(type(control).__name__ for control in page.overlay))
+    print(f"beeps played: {audio_calls.get('play', 0)} (overlapping ones are dropped)")
+    started = BACKGROUND_THREADS & {thread.name for thread in threading.enumerate()}
+    if started:
+        print(f"FAIL: background threads started: {', '.join(sorted(started))}")
+        sys.exit(1)
+    if len(sizes) != 1:
+        print("FAIL: overlay grew")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
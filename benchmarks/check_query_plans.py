@@ -0,0 +1,80 @@
+"""Fail if any hot local query falls back to a full table scan.
+
+Runs EXPLAIN QUERY PLAN for the SQL in local_queries.py, the same statements JobCardPage, the
+TopBar and the outbox uploader issue, against a scratch database built with the app's schema.
+An FTS5 MATCH is answered from the full-text index, so its virtual table "SCAN" is not a table
+scan. Run from the project root:  python benchmarks/check_query_plans.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_db import has_job_card_search, migrate  # noqa: E402
+from local_queries import (  # noqa: E402
+    DEPARTMENT_BY_NAME_SQL, JOB_CARD_EXISTS_SQL, MAX_DAY_SEQUENCE_SQL, OPEN_JOB_CARD_COUNT_SQL,
+    OUTBOX_NEXT_DUE_SQL, OUTBOX_PRUNE_SQL, RENAME_JOB_CARD_SQL, RENAME_OUTBOX_JOB_CARD_SQL,
+    SEARCH_MATCH_COUNT_SQL, SYNCED_JOB_CARD_IDS_SQL, job_card_list_query, outbox_batch_query
+)
+
+LAST_SHOWN = ("2025-01-01 00:00:00", 9)
+MATCH = '"print"* "jam"*'
+
+
+def queries(search_available):
+    plans = {
+        "load_job_cards": job_card_list_query("IT"),
+        "load_job_cards by status": job_card_list_query("IT", "Open"),
+        "load_more_job_cards": job_card_list_query("IT", after=LAST_SHOWN),
+        "search without FTS5": job_card_list_query("IT", terms=["print", "jam"]),
+        "TopBar open count": (OPEN_JOB_CARD_COUNT_SQL, ("IT",)),
+        "load_departments": (DEPARTMENT_BY_NAME_SQL, ("IT",)),
+        "pull_job_cards synced ids": (SYNCED_JOB_CARD_IDS_SQL, ("IT",)),
+        "save_job_card next sequence": (MAX_DAY_SEQUENCE_SQL, (13, "IT20250101-", "IT20250101.")),
+        "save_job_card duplicate check": (JOB_CARD_EXISTS_SQL, (1, "IT20250101-0001")),
+        "outbox drain": outbox_batch_query(0, 0.0, 500),
+        "outbox drain forced": outbox_batch_query(0, 0.0, 500, force=True),
+        "outbox next due": (OUTBOX_NEXT_DUE_SQL, ()),
+        "outbox prune": (OUTBOX_PRUNE_SQL, (0.0,)),
+        "outbox rename job card": (RENAME_JOB_CARD_SQL, (1, "IT20250101-0001", -1)),
+        "outbox rename entries": (RENAME_OUTBOX_JOB_CARD_SQL, (1, -1)),
+    }
+    if search_available:
+        plans.update({
+            "search match count": (SEARCH_MATCH_COUNT_SQL, (MATCH,)),
+            "search ranked": job_card_list_query("IT", terms=["print", "jam"], match=MATCH),
+            "search newest first": job_card_list_query("IT", "Open", 50, terms=["print", "jam"], match=MATCH, ranked=False),
+        })
+    return plans
+
+
+def is_table_scan(detail):
+    return detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "plans.db"))
+        migrate(conn)
+        search_available = has_job_card_search(conn)
+        if not search_available:
+            print("SQLite has no FTS5; full-text search queries NOT checked")
+        for name, (sql, params) in queries(search_available).items():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            scans = [detail for detail in plan if is_table_scan(detail)]
+            status = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{status}] {name}")
+            for detail in plan:
+                print(f"         {detail}")
+        conn.close()
+    if failures:
+        print(f"{failures} queries use a full table scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
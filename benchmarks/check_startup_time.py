@@ -0,0 +1,131 @@
+"""Measure cold-start import time and time to the first login frame, and fail when over budget.
+
+Each measurement runs in a fresh interpreter. The import breakdown comes from python -X importtime;
+the first frame is the first page.update() after main() has built the login view, using a stub page
+instead of a Flet client, so the figure covers the app's own startup work rather than rendering.
+
+Run from the project root:  python benchmarks/check_startup_time.py [runs]
+Budgets can be overridden with STARTUP_APP_IMPORT_BUDGET_MS and STARTUP_FIRST_FRAME_BUDGET_MS.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Milliseconds the app's own modules may add on top of importing flet, and to reach the login frame
+APP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_APP_IMPORT_BUDGET_MS", "150"))
+FIRST_FRAME_BUDGET_MS = float(os.getenv("STARTUP_FIRST_FRAME_BUDGET_MS", "1500"))
+
+# Modules the login screen must not wait for; they are imported on first use or after the first frame
+DEFERRED_MODULES = ["mysql.connector", "flet_audio", "db", "connectivity", "outbox", "jobcard_client", "sidebar"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+class StubPage:
+    """Just enough of ft.Page for main() to route to the login view without a Flet client."""
+
+    def __init__(self):
+        self.overlay = []
+        self.controls = []
+        self.views = []
+        self.window = SimpleNamespace()
+        self.session = SimpleNamespace(values={})
+        self.session.get = self.session.values.get
+        self.session.set = self.session.values.__setitem__
+        self.background = []
+        self.first_frame_at = None
+
+    def update(self, *controls):
+        if self.first_frame_at is None and self.views:
+            self.first_frame_at = time.perf_counter()
+
+    def go(self, route):
+        self.on_route_change(SimpleNamespace(route=route))
+
+    def run_thread(self, handler, *args):
+        # Started after the first frame in the app; recorded here so it doesn't count towards it
+        self.background.append(handler)
+
+    def run_task(self, handler, *args):
+        handler(*args).close()
+
+
+def measure_first_frame():
+    """Child process: import main, run it against a stub page and report timings as JSON."""
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    page = StubPage()
+    main.main(page)
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "first_frame_ms": ((page.first_frame_at or time.perf_counter()) - started) * 1000,
+        "loaded_deferred": [name for name in DEFERRED_MODULES if name in sys.modules],
+    }))
+
+
+def run_child(args, env):
+    return subprocess.run([sys.executable, *args], cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def import_breakdown(env):
+    """Return (module -> cumulative microseconds, lines sorted by cumulative time) for a cold import of main."""
+    result = run_child(["-X", "importtime", "-c", "import main"], env)
+    cumulative = {}
+    lines = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative.setdefault(match.group(4), int(match.group(2)))
+            lines.append((int(match.group(2)), match.group(4)))
+    return cumulative, sorted(lines, reverse=True)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failures = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Scratch database, migrated by the first run like a fresh install
+        env = dict(os.environ, FLET_APP_STORAGE_DATA=data_dir)
+        run_child([os.path.abspath(__file__), "--child"], env)
+
+        cumulative, lines = import_breakdown(env)
+        app_import_ms = (cumulative["main"] - cumulative.get("flet", 0)) / 1000
+        print(f"import main: {cumulative['main'] / 1000:.1f} ms, of which flet {cumulative.get('flet', 0) / 1000:.1f} ms")
+        print("slowest imports (cumulative):")
+        for micros, name in lines[:10]:
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+        imported_deferred = [name for name in DEFERRED_MODULES if name in cumulative]
+
+        samples = [json.loads(run_child([os.path.abspath(__file__), "--child"], env).stdout) for _ in range(runs)]
+        first_frame_ms = sorted(sample["first_frame_ms"] for sample in samples)[len(samples) // 2]
+        import_ms = sorted(sample["import_ms"] for sample in samples)[len(samples) // 2]
+        print(f"median of {runs} runs: import {import_ms:.1f} ms, first login frame {first_frame_ms:.1f} ms")
+        loaded_deferred = sorted({name for sample in samples for name in sample["loaded_deferred"]})
+
+    if app_import_ms > APP_IMPORT_BUDGET_MS:
+        failures.append(f"app imports add {app_import_ms:.1f} ms on top of flet (budget {APP_IMPORT_BUDGET_MS:.0f} ms)")
+    if first_frame_ms > FIRST_FRAME_BUDGET_MS:
+        failures.append(f"first login frame after {first_frame_ms:.1f} ms (budget {FIRST_FRAME_BUDGET_MS:.0f} ms)")
+    if imported_deferred or loaded_deferred:
+        failures.append(f"loaded before the first frame: {', '.join(sorted(set(imported_deferred + loaded_deferred)))}")
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+    print("[ok] startup within budget")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--child"]:
+        measure_first_frame()
+    else:
+        main()
@@ -0,0 +1,118 @@
+import socket
+import threading
+import time
+import weakref
+from db import DB_CONFIG
+
+
+class ConnectivityMonitor:
+    """Background reachability probe for the MySQL server with a cached, O(1) readable state."""
+
+    def __init__(self, host, port, interval=15, max_interval=120, timeout=2):
+        self.host = host
+        self.port = port
+        self.interval = interval  # Seconds between probes while online
+        self.max_interval = max_interval  # Upper bound for the backoff between probes while offline
+        self.timeout = timeout
+        self.online = False
+        self.checked_at = None  # time.time() of the last completed probe, None until the first one
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def probe(self):
+        """Open and immediately close a TCP connection to the server."""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                return True
+        except OSError:
+            return False
+
+    def is_online(self):
+        """Return the cached state without touching the network; False until the first probe completes."""
+        if self.checked_at is None:
+            # Safe to call from the event loop: the probe runs on the background thread
+            self.request_check()
+        return self.online
+
+    def check_now(self):
+        """Probe immediately and publish the result."""
+        online = self.probe()
+        self.set_state(online)
+        return online
+
+    def request_check(self):
+        """Ask the background thread to probe at once instead of waiting for the next interval."""
+        self.wake_event.set()
+
+    def set_state(self, online):
+        """Record a probe result and notify subscribers when reachability changed."""
+        with self.lock:
+            changed = self.checked_at is None or online != self.online
+            self.online = online
+            self.checked_at = time.time()
+            subscribers = list(self.subscribers)
+        if not changed:
+            return
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                self.unsubscribe(ref)
+                continue
+            try:
+                callback(online)
+            except Exception as e:
+                print(f"Error notifying connectivity subscriber: {e}")
+
+    def subscribe(self, callback):
+        """Call callback(online) on every state change; bound methods are held weakly so dead pages drop out."""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self.lock:
+            self.subscribers.append(ref)
+        return ref
+
+    def unsubscribe(self, ref):
+        """Remove a subscription returned by subscribe."""
+        with self.lock:
+            if ref in self.subscribers:
+                self.subscribers.remove(ref)
+
+    def start(self):
+        """Start the background probe thread if it is not running yet."""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="connectivity-monitor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the background probe thread after its current probe."""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def run(self):
+        """Probe loop executed on the background thread."""
+        delay = self.interval
+        while not self.stop_event.is_set():
+            online = self.check_now()
+            # Back off while the server is unreachable, return to the normal interval once it is back
+            delay = self.interval if online else min(delay * 2, self.max_interval)
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_connectivity_monitor():
+    """Return the shared monitor for the MySQL server, starting its probe thread on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = ConnectivityMonitor(DB_CONFIG["host"], DB_CONFIG.get("port", 3306))
+            _monitor.start()
+        return _monitor
@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import mysql.connector
+from mysql.connector import Error
+
+# Connection settings for the central MySQL server
+DB_CONFIG = {
+    "host": "200.200.200.23",
+    "user": "root",
+    "password": "Pak@123",
+    "database": "asm_sys",
+    "auth_plugin": "mysql_native_password",
+    "connection_timeout": 5
+}
+
+# Worker threads for blocking database calls
+DB_WORKERS = 4
+# Threads outside the worker pool that also borrow MySQL connections: the outbox uploader and the login page's sync
+MYSQL_BACKGROUND_CONNECTIONS = 2
+# Enough connections that neither the workers nor those threads ever wait on the pool
+MYSQL_POOL_SIZE = DB_WORKERS + MYSQL_BACKGROUND_CONNECTIONS
+
+
+class MySQLPool:
+    """Process-wide pool of reusable MySQL connections with health checks and idle eviction."""
+
+    def __init__(self, config, max_size=MYSQL_POOL_SIZE, idle_timeout=300, health_check_after=30, acquire_timeout=10):
+        self.config = config
+        self.max_size = max_size  # Maximum open connections (idle + in use)
+        self.idle_timeout = idle_timeout  # Seconds an idle connection is kept before it is closed
+        self.health_check_after = health_check_after  # Idle seconds after which a connection is pinged on checkout
+        self.acquire_timeout = acquire_timeout  # Seconds to wait for a free connection when the pool is exhausted
+        self.idle = []  # (connection, last_used) pairs, most recently used last
+        self.in_use = 0
+        self.lock = threading.Condition()
+
+    def acquire(self):
+        """Check out a healthy connection, reusing an idle one when possible."""
+        conn = None
+        last_used = None
+        with self.lock:
+            self.evict_idle()
+            while True:
+                if self.idle:
+                    conn, last_used = self.idle.pop()
+                    break
+                if self.in_use < self.max_size:
+                    break
+                if not self.lock.wait(self.acquire_timeout):
+                    raise mysql.connector.errors.PoolError("No MySQL connection available in pool")
+            self.in_use += 1
+        try:
+            if conn is not None and time.monotonic() - last_used > self.health_check_after and not self.is_healthy(conn):
+                self.close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = mysql.connector.connect(**self.config)
+            return conn
+        except Exception:
+            with self.lock:
+                self.in_use -= 1
+                self.lock.notify()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, discarding it if it is no longer usable.
+
+        broken marks a connection whose caller hit a MySQL error on it; the link may have dropped
+        mid-query, and an idle check only pings after health_check_after, so it is closed instead.
+        """
+        reusable = not broken
+        try:
+            if reusable and conn.in_transaction:
+                conn.rollback()
+        except Error:
+            reusable = False
+        if not reusable:
+            self.close_quietly(conn)
+        with self.lock:
+            self.in_use -= 1
+            if reusable:
+                self.idle.append((conn, time.monotonic()))
+            self.lock.notify()
+
+    def evict_idle(self):
+        """Close idle connections unused for longer than idle_timeout. Caller must hold the lock."""
+        now = time.monotonic()
+        expired = [conn for conn, last_used in self.idle if now - last_used > self.idle_timeout]
+        self.idle = [(conn, last_used) for conn, last_used in self.idle if now - last_used <= self.idle_timeout]
+        for conn in expired:
+            self.close_quietly(conn)
+
+    def close_all(self):
+        """Close every idle connection in the pool."""
+        with self.lock:
+            for conn, _ in self.idle:
+                self.close_quietly(conn)
+            self.idle = []
+
+    @staticmethod
+    def is_healthy(conn):
+        """Ping the server to verify the connection is still alive."""
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    @staticmethod
+    def close_quietly(conn):
+        """Close a connection, ignoring errors from an already broken link."""
+        try:
+            conn.close()
+        except Error:
+            pass
+
+
+_mysql_pool = None
+_mysql_pool_lock = threading.Lock()
+
+
+def get_mysql_pool():
+    """Return the shared MySQL connection pool, creating it on first use."""
+    global _mysql_pool
+    with _mysql_pool_lock:
+        if _mysql_pool is None:
+            _mysql_pool = MySQLPool(DB_CONFIG)
+        return _mysql_pool
+
+
+def get_mysql_connection():
+    """Check out a connection from the shared MySQL pool."""
+    return get_mysql_pool().acquire()
+
+
+def release_mysql_connection(conn, broken=False):
+    """Return a connection checked out with get_mysql_connection to the shared pool; broken closes it instead."""
+    get_mysql_pool().release(conn, broken)
+
+
+_db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking sqlite3/MySQL call on the bounded worker pool so the Flet event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,85 @@
+import re
+import threading
+
+# Job numbers look like <prefix><YYYYMMDD>-<sequence>, optionally followed by -D<device> while offline
+JOB_NUMBER_PATTERN = re.compile(r"^([A-Za-z0-9]*?)(\d{8})-(\d+)(?:-D[0-9a-f]{4})?$")
+
+_job_sequences_ready = False
+_job_sequences_lock = threading.Lock()
+
+
+def ensure_job_sequences(cursor):
+    """Create the server-side counter table on first use and seed it from existing job numbers."""
+    global _job_sequences_ready
+    if _job_sequences_ready:
+        return
+    with _job_sequences_lock:
+        if _job_sequences_ready:
+            return
+        cursor.execute("SHOW TABLES LIKE 'job_sequences'")
+        exists = cursor.fetchone() is not None
+        if not exists:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS job_sequences (
+                    department VARCHAR(10) NOT NULL,
+                    day CHAR(8) NOT NULL,
+                    next_value INT UNSIGNED NOT NULL,
+                    PRIMARY KEY (department, day)
+                )
+            """)
+            # Start each counter after the highest number already issued; GREATEST keeps a concurrent seed safe
+            cursor.execute("""
+                INSERT INTO job_sequences (department, day, next_value)
+                SELECT seeded.department, seeded.day, seeded.next_value
+                FROM (
+                    SELECT LEFT(head, CHAR_LENGTH(head) - 8) AS department, RIGHT(head, 8) AS day, MAX(seq) + 1 AS next_value
+                    FROM (
+                        SELECT SUBSTRING_INDEX(job_number, '-', 1) AS head,
+                               CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(job_number, '-', 2), '-', -1) AS UNSIGNED) AS seq
+                        FROM job_cards
+                        WHERE job_number REGEXP '^[A-Za-z0-9]*[0-9]{8}-[0-9]+$'
+                    ) AS numbered
+                    GROUP BY head
+                ) AS seeded
+                ON DUPLICATE KEY UPDATE next_value = GREATEST(job_sequences.next_value, seeded.next_value)
+            """)
+        _job_sequences_ready = True
+
+
+def reserve_job_sequences(cursor, department, day, count):
+    """Atomically take count consecutive sequence numbers for a department prefix and YYYYMMDD day; returns the first.
+
+    One statement creates or advances the counter row; LAST_INSERT_ID(expr) hands the first taken
+    value back in the OK packet, so no SELECT follows. The row stays locked until the caller
+    commits, and a rollback returns the numbers.
+    """
+    ensure_job_sequences(cursor)
+    cursor.execute("""
+        INSERT INTO job_sequences (department, day, next_value)
+        VALUES (%s, %s, LAST_INSERT_ID(1) + %s)
+        ON DUPLICATE KEY UPDATE next_value = LAST_INSERT_ID(next_value) + %s
+    """, (department, day, count, count))
+    return cursor.lastrowid
+
+
+def allocate_job_sequence(cursor, department, day):
+    """Atomically take the next sequence number for a department prefix and YYYYMMDD day."""
+    return reserve_job_sequences(cursor, department, day, 1)
+
+
+def advance_job_sequences(cursor, job_numbers):
+    """Move counters past job numbers issued elsewhere (offline cards being uploaded)."""
+    highest = {}
+    for job_number in job_numbers:
+        match = JOB_NUMBER_PATTERN.match(job_number)
+        if match:
+            key = (match.group(1), match.group(2))
+            highest[key] = max(highest.get(key, 0), int(match.group(3)))
+    if not highest:
+        return
+    ensure_job_sequences(cursor)
+    cursor.executemany("""
+        INSERT INTO job_sequences (department, day, next_value)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE next_value = GREATEST(next_value, VALUES(next_value))
+    """, [(department, day, sequence + 1) for (department, day), sequence in highest.items()])
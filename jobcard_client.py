@@ -5,15 +5,103 @@ import flet as ft
 import sqlite3
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
-from flet_audio import Audio
-import uuid
 import re
-import socket
+import time
+from db import get_mysql_connection, release_mysql_connection, run_db
+from connectivity import get_connectivity_monitor
+from job_sequences import reserve_job_sequences
+from local_queries import (
+    DEPARTMENT_BY_NAME_SQL, JOB_CARD_EXISTS_SQL, MAX_DAY_SEQUENCE_SQL, SEARCH_MATCH_COUNT_SQL,
+    SYNCED_JOB_CARD_IDS_SQL, job_card_list_query
+)
+from local_db import bulk_upsert, get_device_id, get_sqlite_connection, has_job_card_search, release_sqlite_connection
+from outbox import enqueue_job_card, get_outbox_uploader
+from overlays import get_dialog, get_snack_bar, play_beep
+from server_schema import has_change_tracking
+from user_sync import sync_departments, watermark_since
+
+# Column order used when writing MySQL job card rows into SQLite
+JOB_CARD_COLUMNS = [
+    "id", "job_number", "title", "description", "status", "created_date", "started_date",
+    "completed_date", "entity_type", "entity_id", "closure_details", "department_name"
+]
+
+# Job numbers reserved from the server per block for offline creation, and the remainder that triggers a new block
+OFFLINE_BLOCK_SIZE = 20
+OFFLINE_BLOCK_LOW_WATER = 5
+# Days ahead, today included, that get a block, so a device starting the day offline still has numbers
+OFFLINE_BLOCK_DAYS = 2
+
+# Job cards loaded per page into the list, and how close (px) to the end scrolling loads the next page
+JOB_CARD_PAGE_SIZE = 50
+LOAD_MORE_THRESHOLD = 300
+
+# Ranking scores every match, so broader searches (e.g. a job number prefix) list newest first instead
+SEARCH_RANK_MAX_MATCHES = 1000
+# Shorter words are ignored while typing: a one-letter prefix matches nearly every card and has no prefix index
+SEARCH_MIN_TERM_LENGTH = 2
+
+# Status badge colour and icon per job card status
+JOB_CARD_STATUS_COLORS = {
+    "Open": ft.Colors.GREEN_600,
+    "Started": ft.Colors.YELLOW_700,
+    "Completed": ft.Colors.BLUE_600
+}
+JOB_CARD_STATUS_ICONS = {
+    "Open": ft.Icons.CIRCLE,
+    "Started": ft.Icons.PLAY_CIRCLE,
+    "Completed": ft.Icons.CHECK_CIRCLE
+}
+
+# Seconds before a cached entity label is refetched from MySQL
+ENTITY_CACHE_TTL = 24 * 60 * 60
+
+# Per entity type: batched lookup query (by id) and the label built from each row
+ENTITY_QUERIES = {
+    "Asset": (
+        "SELECT id, serial_number, model FROM assets WHERE id IN ({})",
+        lambda row: f"Asset: {row['serial_number']} ({row['model']})"
+    ),
+    "Consumable": (
+        """
+            SELECT dc.id, c.cartridge_no, p.model AS printer_model
+            FROM deployed_consumables dc
+            JOIN consumables c ON dc.consumable_id = c.id
+            JOIN printers p ON dc.printer_id = p.id
+            WHERE dc.id IN ({})
+        """,
+        lambda row: f"Consumable: {row['cartridge_no']} (Printer: {row['printer_model']})"
+    ),
+    "Component": (
+        "SELECT id, serial_number, model FROM components WHERE id IN ({})",
+        lambda row: f"Component: {row['serial_number']} ({row['model']})"
+    ),
+    "Device": (
+        "SELECT id, serial_number, model FROM devices WHERE id IN ({})",
+        lambda row: f"Device: {row['serial_number']} ({row['model']})"
+    ),
+}
+
+
+def search_terms(text):
+    """Split search box input into words; punctuation only separates them."""
+    return [term for term in re.findall(r"\w+", text or "") if len(term) >= SEARCH_MIN_TERM_LENGTH]
+
+
+def fts_match_query(terms):
+    """FTS5 query matching cards that contain every term as a word prefix, e.g. "print"* "jam"*."""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def job_number_prefix(department_name):
+    """Return the job number prefix for a department: its alphanumeric characters, at most 10."""
+    return re.sub(r'[^a-zA-Z0-9]', '', department_name)[:10]
+
 
 class JobCardPage(ft.Container):
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, sync_on_load=False):
         super().__init__()
         self.page = page
         self.page.title = "Job Card Management"
@@ -28,27 +116,27 @@ class JobCardPage(ft.Container):
         self.job_cards = []
         self.departments = []
         self.selected_status = None
-        self.sqlite_db_path = "job_cards.db"
-        self.device_id = str(uuid.uuid4())[-4:]  # Last 4 digits of UUID for device-specific job numbers
+        self.search_text = ""  # Current search box input; empty lists the whole department
+        self.listed_filter = None  # (status, search text) of the cards currently listed
+        self.device_id = get_device_id()  # Persisted per install; tags offline job cards
         self.is_syncing = False  # Lock for sync/upload operations
         self.is_updating = False  # Flag to prevent recursive UI updates
+        self.has_more_job_cards = False  # More pages of job cards are available below the list
+        self.is_loading_page = False  # Lock for loading the next page on scroll
+        self.load_tasks = {}  # Load key -> in-flight task shared by every caller asking for that load
+        self.pending_loads = set()  # Load keys requested again while their task was already running
+        self.sync_when_online = False  # Startup sync skipped before the first probe; run it once the server is reachable
+        self.job_card_controls = {}  # Job card id -> (card control, patchable parts) currently in the list
+        self.entity_cache_ttl = ENTITY_CACHE_TTL
         # Safely access user department from session
         user = page.session.get("user")
         self.user_department = user.get("department_name", "") if isinstance(user, dict) else ""
 
-        # Initialize snackbar
-        self.snack_bar = ft.SnackBar(
-            content=ft.Text("", size=14, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
-            bgcolor=ft.Colors.BLACK,
-            duration=6000,
-            show_close_icon=True,
-            behavior=ft.SnackBarBehavior.FLOATING,
-            width=360,
-            padding=10,
-            margin=ft.margin.only(bottom=10),
-            shape=ft.RoundedRectangleBorder(radius=8)
-        )
-        self.page.overlay.append(self.snack_bar)
+        # Snackbar and dialog are shared per Flet page and re-populated on use, so the overlay doesn't grow
+        self.snack_bar = get_snack_bar(self.page)
+        self.dialog = get_dialog(self.page)
+        self.detail_dialog_view = None  # (title, content, actions, value texts), built on first use
+        self.create_dialog_view = None  # (title, content, actions), built on first use
 
         # Initialize UI components
         self.add_job_card_button = ft.ElevatedButton(
@@ -69,7 +157,7 @@ class JobCardPage(ft.Container):
         self.sync_button = ft.IconButton(
             icon=ft.Icons.SYNC,
             icon_color=ft.Colors.WHITE,
-            tooltip="Sync from MySQL",
+            tooltip="Sync from MySQL (hold for full resync)",
             icon_size=24,
             bgcolor=ft.Colors.BLUE_700,
             style=ft.ButtonStyle(
@@ -79,7 +167,8 @@ class JobCardPage(ft.Container):
             ),
             width=48,
             height=48,
-            on_click=self.sync_from_mysql
+            on_click=self.sync_from_mysql,
+            on_long_press=self.full_resync_from_mysql
         )
 
         self.upload_button = ft.IconButton(
@@ -117,17 +206,32 @@ class JobCardPage(ft.Container):
             border_radius=8
         )
 
+        self.search_field = ft.TextField(
+            hint_text="Search job number, title, description...",
+            prefix_icon=ft.Icons.SEARCH,
+            on_change=self.search_job_cards,
+            border_color=ft.Colors.BLUE_300,
+            color=ft.Colors.BLUE_900,
+            text_size=14,
+            dense=True,
+            bgcolor=ft.Colors.WHITE,
+            border_radius=8
+        )
+
         self.job_card_list = ft.ListView(
             controls=[],
             expand=True,
             spacing=10,
             padding=ft.padding.all(5),
-            auto_scroll=True
+            on_scroll=self.on_job_card_list_scroll,
+            on_scroll_interval=100
         )
 
-        # Initialize database and load departments
-        self.init_sqlite_db()
-        self.page.run_task(self.load_departments)
+        # Track server reachability without probing the network on every action
+        get_connectivity_monitor().subscribe(self.on_connectivity_change)
+        self.page.run_task(self.apply_connectivity, get_connectivity_monitor().online)
+        # Offline cards are renamed when the background uploader delivers them
+        get_outbox_uploader().subscribe(self.on_outbox_drained)
 
         # Set up page content
         self.content = ft.Column(
@@ -143,6 +247,7 @@ class JobCardPage(ft.Container):
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                     spacing=5
                 ),
+                self.search_field,
                 ft.Container(
                     content=self.job_card_list,
                     width=380,
@@ -164,118 +269,85 @@ class JobCardPage(ft.Container):
             scroll=ft.ScrollMode.AUTO
         )
 
-        # Schedule async job card loading
+        # Render from SQLite first, then refresh from the server; the schema is migrated once at startup by main
+        self.page.run_task(self.start_up, sync_on_load)
+
+    async def start_up(self, sync_remote):
+        """Startup pipeline: show local departments and job cards, then run one combined refresh from MySQL."""
+        await asyncio.gather(self.load_departments(sync_remote=False), self.load_job_cards())
+        if not self.is_online():
+            self.sync_when_online = sync_remote
+            if not self.departments:
+                self.show_snack_bar("No departments found. Sync required.", ft.Colors.YELLOW_800)
+            return
+        if sync_remote:
+            # Departments ride along on the job card sync's MySQL connection
+            await self.sync_from_mysql(None, include_departments=True)
+        else:
+            await self.load_departments()
+
+    async def coalesce(self, key, load):
+        """Run load() once for all concurrent callers of key; calls arriving mid-run share a single rerun."""
+        self.pending_loads.add(key)
+        task = self.load_tasks.get(key)
+        if task is None or task.done():
+            task = self.load_tasks[key] = asyncio.ensure_future(self.drain_loads(key, load))
+        # Shielded so one caller being cancelled doesn't cancel the load the others are waiting on
+        await asyncio.shield(task)
+
+    async def drain_loads(self, key, load):
+        """Repeat load() until no new request for key came in while it ran."""
+        while key in self.pending_loads:
+            self.pending_loads.discard(key)
+            await load()
+
+    def on_enter(self):
+        """Re-show the cached page: restore the window title and reload the list from SQLite."""
+        self.page.title = "Job Card Management"
+        self.page.window.title = "Job Card Management"
         self.page.run_task(self.load_job_cards)
 
-    def init_sqlite_db(self):
-        """Initialize SQLite database and create job_cards and department tables."""
-        conn = None
-        cursor = None
+    async def load_departments(self, sync_remote=True):
+        """Load departments from SQLite, syncing them from MySQL first if requested and online."""
+        await self.coalesce(("departments", sync_remote), lambda: self.read_and_set_departments(sync_remote))
+
+    async def read_and_set_departments(self, sync_remote):
+        """Read the user's department into self.departments and report sync problems."""
         try:
-            conn = sqlite3.connect(self.sqlite_db_path)
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS department (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL UNIQUE,
-                    description TEXT,
-                    created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
-                    updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS job_cards (
-                    id INTEGER PRIMARY KEY,
-                    job_number TEXT NOT NULL UNIQUE,
-                    title TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    created_date TEXT NOT NULL,
-                    started_date TEXT,
-                    completed_date TEXT,
-                    entity_type TEXT,
-                    entity_id INTEGER,
-                    closure_details TEXT,
-                    department_name TEXT NOT NULL,
-                    FOREIGN KEY (department_name) REFERENCES department(name) ON DELETE RESTRICT
-                )
-            ''')
-            conn.commit()
+            self.departments, sync_error = await run_db(self.read_departments, sync_remote)
+            if sync_error:
+                self.show_snack_bar(f"Error syncing departments: {sync_error}", ft.Colors.RED_800)
+            if sync_remote and not self.departments:
+                self.show_snack_bar("No departments found. Sync required.", ft.Colors.YELLOW_800)
         except sqlite3.Error as e:
-            self.show_snack_bar(f"Error initializing database: {e}", ft.Colors.RED_800)
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+            self.show_snack_bar(f"Error loading departments: {e}", ft.Colors.RED_800)
 
-    async def load_departments(self):
-        """Load departments from MySQL and sync to SQLite if online."""
+    def read_departments(self, sync_remote=True):
+        """Sync departments from MySQL if requested and online, then read user's department from SQLite (blocking)."""
         conn_sqlite = None
         cursor_sqlite = None
         conn_mysql = None
-        cursor_mysql = None
+        sync_error = None
         try:
-            conn_sqlite = sqlite3.connect(self.sqlite_db_path)
+            conn_sqlite = get_sqlite_connection()
             cursor_sqlite = conn_sqlite.cursor()
-            cursor_sqlite.execute("PRAGMA foreign_keys = ON")
-            if self.is_online():
-                db_config = {
-                    "host": "200.200.200.23",
-                    "user": "root",
-                    "password": "Pak@123",
-                    "database": "asm_sys"
-                }
+            if sync_remote and self.is_online():
                 try:
-                    conn_mysql = mysql.connector.connect(**db_config)
-                    cursor_mysql = conn_mysql.cursor(dictionary=True)
-                    cursor_mysql.execute("SELECT id, name, description, created_at, updated_at FROM department")
-                    departments = cursor_mysql.fetchall()
-                    for dept in departments:
-                        cursor_sqlite.execute("SELECT id FROM department WHERE id = ?", (dept['id'],))
-                        if cursor_sqlite.fetchone():
-                            cursor_sqlite.execute("""
-                                UPDATE department
-                                SET name = ?, description = ?, created_at = ?, updated_at = ?
-                                WHERE id = ?
-                            """, (
-                                dept['name'],
-                                dept['description'],
-                                dept['created_at'].strftime('%Y-%m-%d %H:%M:%S') if dept['created_at'] else None,
-                                dept['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if dept['updated_at'] else None,
-                                dept['id']
-                            ))
-                        else:
-                            cursor_sqlite.execute("""
-                                INSERT INTO department (id, name, description, created_at, updated_at)
-                                VALUES (?, ?, ?, ?, ?)
-                            """, (
-                                dept['id'],
-                                dept['name'],
-                                dept['description'],
-                                dept['created_at'].strftime('%Y-%m-%d %H:%M:%S') if dept['created_at'] else None,
-                                dept['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if dept['updated_at'] else None
-                            ))
-                        conn_sqlite.commit()
+                    conn_mysql = get_mysql_connection()
+                    # Only departments changed since the last sync are transferred and written
+                    sync_departments(conn_mysql, conn_sqlite)
                 except mysql.connector.Error as e:
-                    self.show_snack_bar(f"Error syncing departments: {e}", ft.Colors.RED_800)
+                    sync_error = e
                 finally:
-                    if cursor_mysql:
-                        cursor_mysql.close()
                     if conn_mysql:
-                        conn_mysql.close()
-            cursor_sqlite.execute("SELECT id, name FROM department WHERE name = ?", (self.user_department,))
-            self.departments = [dict(id=row[0], name=row[1]) for row in cursor_sqlite.fetchall()]
-            if not self.departments:
-                self.show_snack_bar("No departments found. Sync required.", ft.Colors.YELLOW_800)
-        except sqlite3.Error as e:
-            self.show_snack_bar(f"Error loading departments: {e}", ft.Colors.RED_800)
+                        release_mysql_connection(conn_mysql, broken=sync_error is not None)
+            cursor_sqlite.execute(DEPARTMENT_BY_NAME_SQL, (self.user_department,))
+            return [dict(id=row[0], name=row[1]) for row in cursor_sqlite.fetchall()], sync_error
         finally:
             if cursor_sqlite:
                 cursor_sqlite.close()
             if conn_sqlite:
-                conn_sqlite.close()
+                release_sqlite_connection(conn_sqlite)
 
     def safe_update(self, context=""):
         """Safely update the UI without triggering recursive snackbar calls."""
@@ -290,226 +362,353 @@ class JobCardPage(ft.Container):
             self.is_updating = False
 
     def is_online(self):
-        """Check if the MySQL server is reachable."""
-        try:
-            socket.create_connection(("200.200.200.23", 3306), timeout=2)
-            return True
-        except OSError:
-            return False
+        """Check if the MySQL server is reachable, using the cached connectivity monitor state."""
+        return get_connectivity_monitor().is_online()
+
+    def on_connectivity_change(self, online):
+        """Called from the connectivity monitor thread when the server becomes reachable or unreachable."""
+        self.page.run_task(self.apply_connectivity, online)
+
+    async def apply_connectivity(self, online):
+        """Reflect server reachability on the sync and upload buttons."""
+        for button in (self.sync_button, self.upload_button):
+            button.bgcolor = ft.Colors.BLUE_700 if online else ft.Colors.GREY_500
+        self.sync_button.tooltip = "Sync from MySQL (hold for full resync)" if online else "Offline: server unreachable"
+        self.upload_button.tooltip = "Upload to MySQL" if online else "Offline: server unreachable"
+        self.safe_update("apply_connectivity")
+        if online:
+            try:
+                await run_db(self.refresh_offline_block)
+            except (sqlite3.Error, mysql.connector.Error) as e:
+                print(f"Error reserving offline job numbers: {e}")
+            if self.sync_when_online:
+                self.sync_when_online = False
+                await self.sync_from_mysql(None, include_departments=True)
+
+    def on_outbox_drained(self, result):
+        """Called from the outbox uploader thread after a pass that delivered or failed job cards."""
+        self.page.run_task(self.apply_outbox_result, result)
+
+    async def apply_outbox_result(self, result):
+        """Reload the list when a delivered card shown on it got its final job number."""
+        shown = {jc['id']: jc['job_number'] for jc in self.job_cards}
+        if any(job_card_id in shown and shown[job_card_id] != job_number for job_card_id, job_number in result["uploaded"]):
+            await self.load_job_cards()
 
     async def load_job_cards(self):
-        """Load job cards from SQLite for user's department with optional status filter."""
+        """Load or reload the listed job cards; concurrent reloads are coalesced into one running load."""
+        await self.coalesce("job_cards", self.render_job_cards)
+
+    async def render_job_cards(self):
+        """Read the listed job cards from SQLite for user's department with optional status filter and search, and rebuild the list."""
+        listed_filter = (self.selected_status, self.search_text)
+        # A reload of the same listing re-reads as many cards as are shown so the user's scroll depth is kept
+        limit = max(JOB_CARD_PAGE_SIZE, len(self.job_cards)) if listed_filter == self.listed_filter else JOB_CARD_PAGE_SIZE
         self.job_cards = []
-        conn = None
-        cursor = None
+        self.has_more_job_cards = False
         try:
-            conn = sqlite3.connect(self.sqlite_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON")
-            query = "SELECT * FROM job_cards WHERE department_name = ?"
-            params = [self.user_department]
-            if self.selected_status:
-                query += " AND status = ?"
-                params.append(self.selected_status)
-            cursor.execute(query, params)
-            self.job_cards = [dict(row) for row in cursor.fetchall()]
-            for jc in self.job_cards:
-                if jc['entity_type'] and jc['entity_id']:
-                    jc['entity_info'] = self.get_entity_info(jc['entity_type'], jc['entity_id'])
-                else:
-                    jc['entity_info'] = "No entity assigned"
+            job_cards, self.has_more_job_cards, stale_entities = await run_db(
+                self.read_job_cards, self.selected_status, None, limit, self.search_text
+            )
+            self.job_cards = job_cards
+            self.listed_filter = listed_filter
             self.job_card_list.controls = self.create_job_card_list()
-            if not self.job_cards:
+            # An empty search result is shown in the list; a snackbar per keystroke would only get in the way
+            if not self.job_cards and not search_terms(self.search_text):
                 self.show_snack_bar("No job cards found for your department. Press Sync to fetch.", ft.Colors.YELLOW_800)
             self.safe_update("load_job_cards")
+            self.refresh_top_bar_count()
+            if stale_entities:
+                self.page.run_task(self.refresh_entity_cache, stale_entities)
+        except sqlite3.Error as e:
+            self.show_snack_bar(f"Error loading job cards: {e}", ft.Colors.RED_800)
+
+    def refresh_top_bar_count(self):
+        """Have the top bar recount open job cards after the local data changed."""
+        top_bar_ref = getattr(self.page, "top_bar_ref", None)
+        if top_bar_ref and top_bar_ref.current:
+            self.page.run_task(top_bar_ref.current.refresh_job_count)
+
+    async def load_more_job_cards(self):
+        """Append the next page of job cards after the last one shown."""
+        if not self.has_more_job_cards or self.is_loading_page or not self.job_cards:
+            return
+        self.is_loading_page = True
+        try:
+            listed_filter = (self.selected_status, self.search_text)
+            shown = self.job_cards
+            last = shown[-1]
+            # Search results are ranked, so they continue by offset rather than by (created_date, id)
+            after = len(shown) if search_terms(self.search_text) else (last['created_date'], last['id'])
+            job_cards, has_more, stale_entities = await run_db(
+                self.read_job_cards, self.selected_status, after, JOB_CARD_PAGE_SIZE, self.search_text
+            )
+            # The filter changed or a reload replaced the list meanwhile; this page belongs to the old listing
+            if (self.selected_status, self.search_text) != listed_filter or self.job_cards is not shown:
+                return
+            self.has_more_job_cards = has_more
+            self.job_cards.extend(job_cards)
+            self.job_card_list.controls.extend(self.create_job_card(jc)[0] for jc in job_cards)
+            self.safe_update("load_more_job_cards")
+            if stale_entities:
+                self.page.run_task(self.refresh_entity_cache, stale_entities)
         except sqlite3.Error as e:
             self.show_snack_bar(f"Error loading job cards: {e}", ft.Colors.RED_800)
+        finally:
+            self.is_loading_page = False
+
+    async def on_job_card_list_scroll(self, e: ft.OnScrollEvent):
+        """Load the next page when the list is scrolled close to its end."""
+        if e.pixels is not None and e.max_scroll_extent is not None and e.pixels >= e.max_scroll_extent - LOAD_MORE_THRESHOLD:
+            await self.load_more_job_cards()
+
+    def read_job_cards(self, status, after=None, limit=JOB_CARD_PAGE_SIZE, search=""):
+        """Read one page of user's department job cards with cached entity labels (blocking).
+
+        Without search text cards come newest first and after is the (created_date, id) of the last
+        card already shown; with it they come best match first and after is the number already shown.
+        Returns the page, whether more cards follow and the entities whose cached labels need a refresh.
+        """
+        conn = None
+        cursor = None
+        terms = search_terms(search)
+        try:
+            conn = get_sqlite_connection()
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            match = None
+            ranked = True
+            if terms and has_job_card_search(conn):
+                match = fts_match_query(terms)
+                ranked = cursor.execute(SEARCH_MATCH_COUNT_SQL, (match,)).fetchone()[0] <= SEARCH_RANK_MAX_MATCHES
+            query, params = job_card_list_query(self.user_department, status, after, limit + 1, terms, match, ranked)
+            cursor.execute(query, params)
+            job_cards = [dict(row) for row in cursor.fetchall()]
         finally:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                release_sqlite_connection(conn)
+        has_more = len(job_cards) > limit
+        job_cards = job_cards[:limit]
+        stale_entities = set()
+        now = time.time()
+        for jc in job_cards:
+            cached_entity_info = jc.pop('cached_entity_info')
+            entity_fetched_at = jc.pop('entity_fetched_at')
+            if jc['entity_type'] and jc['entity_id']:
+                jc['entity_info'] = cached_entity_info or "Loading entity info..."
+                if entity_fetched_at is None or now - entity_fetched_at > self.entity_cache_ttl:
+                    stale_entities.add((jc['entity_type'], jc['entity_id']))
+            else:
+                jc['entity_info'] = "No entity assigned"
+        return job_cards, has_more, stale_entities
 
-    async def sync_from_mysql(self, e):
-        """Sync job cards from MySQL to SQLite for user's department."""
+    async def full_resync_from_mysql(self, e):
+        """Re-fetch every job card for user's department, ignoring the delta sync watermark."""
+        await self.sync_from_mysql(e, full_resync=True)
+
+    async def sync_from_mysql(self, e, full_resync=False, include_departments=False):
+        """Sync job cards changed since the last sync (and optionally departments) from MySQL to SQLite."""
         if self.is_syncing:
             self.show_snack_bar("Sync in progress, please wait.", ft.Colors.YELLOW_800)
             return
+        self.is_syncing = True
         if not self.is_online():
+            self.is_syncing = False
+            get_connectivity_monitor().request_check()
             self.show_snack_bar("Network error: Cannot connect to database server", ft.Colors.RED_800)
             return
-        self.is_syncing = True
         self.sync_button.disabled = True
         self.upload_button.disabled = True
         self.sync_button.content = ft.ProgressRing(width=24, height=24, stroke_width=2)
         self.safe_update("disable_sync_buttons")
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys"
-        }
+        try:
+            synced_count, failed_job_numbers, is_delta = await run_db(self.pull_job_cards, full_resync, include_departments)
+            for job_number in failed_job_numbers:
+                self.show_snack_bar(f"Error syncing job card {job_number}: constraint violation", ft.Colors.RED_800)
+            if is_delta:
+                self.show_snack_bar(f"Synced {synced_count} changed job cards successfully!", ft.Colors.TEAL_600)
+            else:
+                self.show_snack_bar(f"Synced {synced_count} job cards successfully!", ft.Colors.TEAL_600)
+            if include_departments:
+                await self.load_departments(sync_remote=False)
+            await self.load_job_cards()
+            self.play_beep()
+        except (mysql.connector.Error, sqlite3.Error) as e:
+            self.show_snack_bar(f"Sync failed: Database error - {e}", ft.Colors.RED_800)
+        finally:
+            self.is_syncing = False
+            self.sync_button.disabled = False
+            self.upload_button.disabled = False
+            self.sync_button.content = None
+            self.sync_button.icon = ft.Icons.SYNC
+            self.safe_update("enable_sync_buttons")
+
+    def pull_job_cards(self, full_resync=False, include_departments=False):
+        """Copy changed job cards from MySQL into SQLite and return (synced, failed job numbers, is_delta) (blocking)."""
         conn_sqlite = None
         conn_mysql = None
+        mysql_broken = False
         cursor_sqlite = None
         cursor_mysql = None
         try:
-            conn_mysql = mysql.connector.connect(**db_config)
+            conn_mysql = get_mysql_connection()
             cursor_mysql = conn_mysql.cursor(dictionary=True)
-            conn_sqlite = sqlite3.connect(self.sqlite_db_path)
+            conn_sqlite = get_sqlite_connection()
             cursor_sqlite = conn_sqlite.cursor()
-            cursor_sqlite.execute("PRAGMA foreign_keys = ON")
-            cursor_mysql.execute("""
+            if include_departments:
+                sync_departments(conn_mysql, conn_sqlite)
+            last_modified = None
+            # Until the server migration adds job_cards.updated_at every sync is a full pull
+            tracked = has_change_tracking(cursor_mysql, "job_cards")
+            if tracked and not full_resync:
+                cursor_sqlite.execute("SELECT last_modified FROM sync_state WHERE department_name = ?", (self.user_department,))
+                sync_state = cursor_sqlite.fetchone()
+                last_modified = sync_state[0] if sync_state else None
+            query = f"""
                 SELECT id, job_number, title, description, status, created_date, started_date,
                        completed_date, entity_type, entity_id, closure_details, department_name
+                       {", updated_at" if tracked else ""}
                 FROM job_cards WHERE department_name = %s
-            """, (self.user_department,))
+            """
+            params = [self.user_department]
+            if last_modified:
+                # The watermark is the server's updated_at, so cards uploaded late with old created dates are
+                # still picked up; the lookback re-reads a short overlap and the upsert is idempotent
+                query += " AND (updated_at >= %s OR updated_at IS NULL)"
+                params.append(watermark_since(last_modified))
+            cursor_mysql.execute(query, params)
             mysql_job_cards = cursor_mysql.fetchall()
-            for jc in mysql_job_cards:
-                try:
-                    values = (
-                        jc['id'],
-                        jc['job_number'],
-                        jc['title'],
-                        jc['description'],
-                        jc['status'],
-                        jc['created_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['created_date'] else None,
-                        jc['started_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['started_date'] else None,
-                        jc['completed_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['completed_date'] else None,
-                        jc['entity_type'],
-                        jc['entity_id'],
-                        jc['closure_details'],
-                        jc['department_name']
-                    )
-                    cursor_sqlite.execute("SELECT id FROM job_cards WHERE id = ?", (jc['id'],))
-                    if cursor_sqlite.fetchone():
-                        cursor_sqlite.execute("""
-                            UPDATE job_cards
-                            SET job_number = ?, title = ?, description = ?, status = ?, created_date = ?,
-                                started_date = ?, completed_date = ?, entity_type = ?, entity_id = ?,
-                                closure_details = ?, department_name = ?
-                            WHERE id = ?
-                        """, values[1:] + (jc['id'],))
-                    else:
-                        cursor_sqlite.execute("""
-                            INSERT INTO job_cards (id, job_number, title, description, status, created_date,
-                                                  started_date, completed_date, entity_type, entity_id,
-                                                  closure_details, department_name)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, values)
-                    conn_sqlite.commit()
-                except sqlite3.Error as e:
-                    self.show_snack_bar(f"Error syncing job card {jc['job_number']}: {e}", ft.Colors.RED_800)
-                    continue
-            self.show_snack_bar(f"Synced {len(mysql_job_cards)} job cards successfully!", ft.Colors.TEAL_600)
-            await self.load_job_cards()
+            rows = [
+                (
+                    jc['id'],
+                    jc['job_number'],
+                    jc['title'],
+                    jc['description'],
+                    jc['status'],
+                    jc['created_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['created_date'] else None,
+                    jc['started_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['started_date'] else None,
+                    jc['completed_date'].strftime('%Y-%m-%d %H:%M:%S') if jc['completed_date'] else None,
+                    jc['entity_type'],
+                    jc['entity_id'],
+                    jc['closure_details'],
+                    jc['department_name']
+                )
+                for jc in mysql_job_cards
+            ]
+            failed_rows = bulk_upsert(conn_sqlite, "job_cards", JOB_CARD_COLUMNS, rows)
+            if not last_modified:
+                # A full pull lists every card of the department, so synced ones missing from it are gone from the server
+                server_ids = {jc['id'] for jc in mysql_job_cards}
+                cursor_sqlite.execute(SYNCED_JOB_CARD_IDS_SQL, (self.user_department,))
+                stale_ids = [(row[0],) for row in cursor_sqlite.fetchall() if row[0] not in server_ids]
+                with conn_sqlite:
+                    conn_sqlite.executemany("DELETE FROM job_cards WHERE id = ?", stale_ids)
+            # Only advance the watermark when every row landed, so failed rows are retried next sync
+            if not failed_rows:
+                new_last_modified = max(
+                    [last_modified or ""] + [jc['updated_at'].strftime('%Y-%m-%d %H:%M:%S') for jc in mysql_job_cards if jc.get('updated_at')]
+                ) or None
+                cursor_sqlite.execute("""
+                    INSERT INTO sync_state (department_name, last_modified, last_synced_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(department_name) DO UPDATE SET
+                        last_modified = excluded.last_modified, last_synced_at = excluded.last_synced_at
+                """, (self.user_department, new_last_modified, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                conn_sqlite.commit()
             try:
-                audio = Audio(src="assets/beep.mp3", autoplay=True, on_state_changed=self.remove_audio)
-                self.page.overlay.append(audio)
-                self.safe_update("play_sync_audio")
-            except Exception as e:
-                self.show_snack_bar(f"Error playing audio: {e}", ft.Colors.RED_800)
-        except mysql.connector.Error as e:
-            self.show_snack_bar(f"Sync failed: Database error - {e}", ft.Colors.RED_800)
+                self.reserve_offline_block(conn_mysql, conn_sqlite)
+            except mysql.connector.Error as e:
+                print(f"Error reserving offline job numbers: {e}")
+            return len(mysql_job_cards), [row[1] for row in failed_rows], bool(last_modified)
+        except mysql.connector.Error:
+            mysql_broken = True
+            raise
         finally:
             if cursor_sqlite:
                 cursor_sqlite.close()
             if conn_sqlite:
-                conn_sqlite.close()
+                release_sqlite_connection(conn_sqlite)
             if cursor_mysql:
                 cursor_mysql.close()
             if conn_mysql:
-                conn_mysql.close()
-            self.is_syncing = False
-            self.sync_button.disabled = False
-            self.upload_button.disabled = False
-            self.sync_button.content = None
-            self.sync_button.icon = ft.Icons.SYNC
-            self.safe_update("enable_sync_buttons")
+                release_mysql_connection(conn_mysql, broken=mysql_broken)
+
+    def reserve_offline_block(self, conn_mysql, conn_sqlite, department=None):
+        """Reserve fresh blocks of job numbers for today and the coming days wherever the local one runs low (blocking)."""
+        department = department or job_number_prefix(self.user_department)
+        today = datetime.now()
+        days = [(today + timedelta(days=offset)).strftime('%Y%m%d') for offset in range(OFFLINE_BLOCK_DAYS)]
+        remaining = dict(conn_sqlite.execute(
+            f"SELECT day, end_value - next_value FROM job_number_blocks WHERE department = ? AND day IN ({', '.join(['?'] * len(days))})",
+            [department] + days
+        ))
+        low_days = [day for day in days if remaining.get(day, 0) < OFFLINE_BLOCK_LOW_WATER]
+        if not low_days:
+            return
+        cursor_mysql = conn_mysql.cursor()
+        try:
+            blocks = [(department, day, reserve_job_sequences(cursor_mysql, department, day, OFFLINE_BLOCK_SIZE)) for day in low_days]
+            conn_mysql.commit()
+        finally:
+            cursor_mysql.close()
+        # The few numbers left in a replaced block are skipped; job numbers only need to be unique
+        with conn_sqlite:
+            conn_sqlite.execute("DELETE FROM job_number_blocks WHERE day < ?", (days[0],))
+            conn_sqlite.executemany("""
+                INSERT INTO job_number_blocks (department, day, next_value, end_value)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(department, day) DO UPDATE SET next_value = excluded.next_value, end_value = excluded.end_value
+            """, [(department, day, start, start + OFFLINE_BLOCK_SIZE) for department, day, start in blocks])
+
+    def refresh_offline_block(self, department=None):
+        """Top up the offline job number block with pooled connections (blocking)."""
+        conn_sqlite = None
+        conn_mysql = None
+        mysql_broken = False
+        try:
+            conn_sqlite = get_sqlite_connection()
+            conn_mysql = get_mysql_connection()
+            self.reserve_offline_block(conn_mysql, conn_sqlite, department)
+        except mysql.connector.Error:
+            mysql_broken = True
+            raise
+        finally:
+            if conn_sqlite:
+                release_sqlite_connection(conn_sqlite)
+            if conn_mysql:
+                release_mysql_connection(conn_mysql, broken=mysql_broken)
 
     async def upload_to_mysql(self, e):
         """Upload job cards from SQLite to MySQL."""
         if self.is_syncing:
             self.show_snack_bar("Upload in progress, please wait.", ft.Colors.YELLOW_800)
             return
+        self.is_syncing = True
         if not self.is_online():
+            self.is_syncing = False
+            get_connectivity_monitor().request_check()
             self.show_snack_bar("Network error: Cannot connect to database server", ft.Colors.RED_800)
             return
-        self.is_syncing = True
         self.sync_button.disabled = True
         self.upload_button.disabled = True
         self.upload_button.content = ft.ProgressRing(width=24, height=24, stroke_width=2)
         self.safe_update("disable_upload_buttons")
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys"
-        }
-        conn_sqlite = None
-        conn_mysql = None
-        cursor_sqlite = None
-        cursor_mysql = None
         try:
-            conn_sqlite = sqlite3.connect(self.sqlite_db_path)
-            conn_sqlite.row_factory = sqlite3.Row
-            cursor_sqlite = conn_sqlite.cursor()
-            cursor_sqlite.execute("PRAGMA foreign_keys = ON")
-            cursor_sqlite.execute("SELECT * FROM job_cards WHERE job_number LIKE ? AND department_name = ?", (f"%-D{self.device_id}", self.user_department))
-            job_cards = [dict(row) for row in cursor_sqlite.fetchall()]
-            conn_mysql = mysql.connector.connect(**db_config)
-            cursor_mysql = conn_mysql.cursor()
-            uploaded_count = 0
-            for jc in job_cards:
-                normalized_job_number = jc['job_number']
-                if '-' in jc['job_number'] and jc['job_number'].endswith(f"-D{self.device_id}"):
-                    parts = jc['job_number'].rsplit('-', 2)
-                    if len(parts) == 3 and parts[-1] == f"D{self.device_id}":
-                        normalized_job_number = f"{parts[0]}-{parts[1]}"
-                if len(normalized_job_number) > 30:
-                    self.show_snack_bar(f"Job number {normalized_job_number} too long for {jc['department_name']}", ft.Colors.RED_800)
-                    continue
-                cursor_mysql.execute("SELECT id FROM job_cards WHERE id = %s OR job_number = %s", (jc['id'], normalized_job_number))
-                if cursor_mysql.fetchone():
-                    continue
-                cursor_mysql.execute("""
-                    INSERT INTO job_cards (id, job_number, title, description, status, created_date, started_date,
-                                           completed_date, entity_type, entity_id, closure_details, department_name)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    jc['id'], normalized_job_number, jc['title'], jc['description'], jc['status'], jc['created_date'],
-                    jc['started_date'], jc['completed_date'], jc['entity_type'], jc['entity_id'],
-                    jc['closure_details'], jc['department_name']
-                ))
-                cursor_sqlite.execute("UPDATE job_cards SET job_number = ? WHERE id = ?", (normalized_job_number, jc['id']))
-                conn_sqlite.commit()
-                uploaded_count += 1
-            conn_mysql.commit()
-            self.show_snack_bar(f"Uploaded {uploaded_count} job cards successfully!", ft.Colors.TEAL_600)
-            await self.load_job_cards()
-            try:
-                audio = Audio(src="assets/beep.mp3", autoplay=True, on_state_changed=self.remove_audio)
-                self.page.overlay.append(audio)
-                self.safe_update("play_upload_audio")
-            except Exception as e:
-                self.show_snack_bar(f"Error playing audio: {e}", ft.Colors.RED_800)
-        except mysql.connector.Error as e:
-            if e.errno == 1406:
-                self.show_snack_bar(f"Upload failed: Job number too long for {jc['department_name']}", ft.Colors.RED_800)
-            elif e.errno == 1062:
-                self.show_snack_bar(f"Upload failed: Duplicate job number {normalized_job_number}", ft.Colors.RED_800)
-            else:
-                self.show_snack_bar(f"Upload failed: Database error - {e}", ft.Colors.RED_800)
+            result = await run_db(get_outbox_uploader().drain, True)
+            summary = f"Uploaded {len(result['uploaded'])} job cards successfully!"
+            if result["skipped_duplicate"]:
+                summary += f" Skipped {len(result['skipped_duplicate'])} already on server."
+            if result["rejected_too_long"]:
+                summary += f" Rejected {len(result['rejected_too_long'])} with too-long job numbers."
+            if result["failed"]:
+                summary += f" {len(result['failed'])} failed and will be retried."
+            self.show_snack_bar(summary, ft.Colors.TEAL_600 if not result["failed"] else ft.Colors.YELLOW_800)
+            self.play_beep()
+        except (mysql.connector.Error, sqlite3.Error) as e:
+            self.show_snack_bar(f"Upload failed: Database error - {e}", ft.Colors.RED_800)
         finally:
-            if cursor_sqlite:
-                cursor_sqlite.close()
-            if conn_sqlite:
-                conn_sqlite.close()
-            if cursor_mysql:
-                cursor_mysql.close()
-            if conn_mysql:
-                conn_mysql.close()
             self.is_syncing = False
             self.sync_button.disabled = False
             self.upload_button.disabled = False
@@ -517,155 +716,224 @@ class JobCardPage(ft.Container):
             self.upload_button.icon = ft.Icons.UPLOAD
             self.safe_update("enable_upload_buttons")
 
-    async def remove_audio(self, e):
-        """Remove audio component from overlay after playback."""
-        if e.control in self.page.overlay:
-            self.page.overlay.remove(e.control)
-            self.safe_update("remove_audio")
+    def play_beep(self):
+        """Play the shared notification sound."""
+        try:
+            play_beep(self.page)
+        except Exception as e:
+            self.show_snack_bar(f"Error playing audio: {e}", ft.Colors.RED_800)
+
+    async def search_job_cards(self, e):
+        """Re-run the search as the user types; keystrokes arriving mid-query collapse into one rerun."""
+        self.search_text = self.search_field.value or ""
+        await self.load_job_cards()
 
     async def filter_job_cards(self, e):
         """Filter job cards by status."""
         self.selected_status = self.status_filter.value
         await self.load_job_cards()
 
-    def get_entity_info(self, entity_type, entity_id):
-        """Fetch entity details from MySQL if online."""
-        if not self.is_online():
-            return "Network error: Cannot fetch entity info"
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys"
-        }
+    def fetch_entity_labels(self, entities):
+        """Fetch entity details for (entity_type, entity_id) pairs from MySQL with one query per entity type."""
+        ids_by_type = {}
+        for entity_type, entity_id in entities:
+            ids_by_type.setdefault(entity_type, set()).add(entity_id)
+
+        labels = {}
+        for entity_type, entity_ids in ids_by_type.items():
+            if entity_type not in ENTITY_QUERIES:
+                labels.update({(entity_type, entity_id): "Unknown Entity" for entity_id in entity_ids})
+            else:
+                labels.update({(entity_type, entity_id): f"Unknown {entity_type}" for entity_id in entity_ids})
+
         conn = None
         cursor = None
+        mysql_broken = False
         try:
-            conn = mysql.connector.connect(**db_config)
+            conn = get_mysql_connection()
             cursor = conn.cursor(dictionary=True)
-            if entity_type == "Asset":
-                cursor.execute("SELECT serial_number, model FROM assets WHERE id = %s", (entity_id,))
-                result = cursor.fetchone()
-                return f"Asset: {result['serial_number']} ({result['model']})" if result else "Unknown Asset"
-            elif entity_type == "Consumable":
-                cursor.execute("""
-                    SELECT c.cartridge_no, p.model AS printer_model
-                    FROM deployed_consumables dc
-                    JOIN consumables c ON dc.consumable_id = c.id
-                    JOIN printers p ON dc.printer_id = p.id
-                    WHERE dc.id = %s
-                """, (entity_id,))
-                result = cursor.fetchone()
-                return f"Consumable: {result['cartridge_no']} (Printer: {result['printer_model']})" if result else "Unknown Consumable"
-            elif entity_type == "Component":
-                cursor.execute("SELECT serial_number, model FROM components WHERE id = %s", (entity_id,))
-                result = cursor.fetchone()
-                return f"Component: {result['serial_number']} ({result['model']})" if result else "Unknown Component"
-            elif entity_type == "Device":
-                cursor.execute("SELECT serial_number, model FROM devices WHERE id = %s", (entity_id,))
-                result = cursor.fetchone()
-                return f"Device: {result['serial_number']} ({result['model']})" if result else "Unknown Device"
-            return "Unknown Entity"
-        except mysql.connector.Error as e:
-            return "Error fetching entity info"
+            for entity_type, entity_ids in ids_by_type.items():
+                if entity_type not in ENTITY_QUERIES:
+                    continue
+                query, format_label = ENTITY_QUERIES[entity_type]
+                entity_ids = sorted(entity_ids)
+                cursor.execute(query.format(", ".join(["%s"] * len(entity_ids))), entity_ids)
+                for row in cursor.fetchall():
+                    labels[(entity_type, row['id'])] = format_label(row)
+            return labels
+        except mysql.connector.Error:
+            mysql_broken = True
+            raise
         finally:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                release_mysql_connection(conn, broken=mysql_broken)
+
+    async def refresh_entity_cache(self, entities):
+        """Refresh stale or missing entity labels from MySQL into the local entity cache."""
+        if not self.is_online():
+            self.set_entity_info_fallback(entities, "Network error: Cannot fetch entity info")
+            return
+        try:
+            labels = await run_db(self.fetch_entity_labels, entities)
+        except mysql.connector.Error:
+            self.set_entity_info_fallback(entities, "Error fetching entity info")
+            return
+
+        try:
+            await run_db(self.store_entity_labels, labels)
+        except sqlite3.Error as e:
+            self.show_snack_bar(f"Error caching entity info: {e}", ft.Colors.RED_800)
+
+        for jc in self.job_cards:
+            key = (jc['entity_type'], jc['entity_id'])
+            if key in labels:
+                jc['entity_info'] = labels[key]
+
+    def store_entity_labels(self, labels):
+        """Write fetched entity labels into the local entity cache (blocking)."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_sqlite_connection()
+            cursor = conn.cursor()
+            fetched_at = time.time()
+            cursor.executemany("""
+                INSERT INTO entity_cache (entity_type, entity_id, label, fetched_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(entity_type, entity_id) DO UPDATE SET label = excluded.label, fetched_at = excluded.fetched_at
+            """, [(entity_type, entity_id, label, fetched_at) for (entity_type, entity_id), label in labels.items()])
+            conn.commit()
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                release_sqlite_connection(conn)
+
+    def set_entity_info_fallback(self, entities, message):
+        """Show a fallback message for entities that have no cached label yet."""
+        for jc in self.job_cards:
+            if (jc['entity_type'], jc['entity_id']) in entities and jc['entity_info'] == "Loading entity info...":
+                jc['entity_info'] = message
 
     def create_job_card_list(self):
-        """Create card-based list for job cards."""
+        """Create card-based list for job cards, reusing the existing control of every card already shown."""
         if not self.job_cards:
+            self.job_card_controls = {}
             return [ft.Container(
-                content=ft.Text("No job cards found.", size=16, color=ft.Colors.RED_600, text_align=ft.TextAlign.CENTER),
+                content=ft.Text("No matching job cards." if search_terms(self.search_text) else "No job cards found.", size=16, color=ft.Colors.RED_600, text_align=ft.TextAlign.CENTER),
                 padding=ft.padding.all(20),
                 alignment=ft.alignment.center
             )]
+        controls = {}
         cards = []
         for jc in self.job_cards:
-            status_color = {
-                "Open": ft.Colors.GREEN_600,
-                "Started": ft.Colors.YELLOW_700,
-                "Completed": ft.Colors.BLUE_600
-            }.get(jc.get('status', ''), ft.Colors.GREY_600)
-            status_icon = {
-                "Open": ft.Icons.CIRCLE,
-                "Started": ft.Icons.PLAY_CIRCLE,
-                "Completed": ft.Icons.CHECK_CIRCLE
-            }.get(jc.get('status', ''), ft.Icons.INFO)
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column(
-                        controls=[
-                            ft.Row(
-                                controls=[
-                                    ft.Text(
-                                        jc.get('job_number', 'N/A'),
-                                        size=16,
-                                        weight=ft.FontWeight.BOLD,
-                                        color=ft.Colors.BLUE_900,
-                                        max_lines=1,
-                                        overflow=ft.TextOverflow.ELLIPSIS
-                                    ),
-                                    ft.Container(
-                                        content=ft.Row([
-                                            ft.Icon(status_icon, size=14, color=ft.Colors.WHITE),
-                                            ft.Text(jc.get('status', 'N/A'), size=12, color=ft.Colors.WHITE)
-                                        ], spacing=5, alignment=ft.MainAxisAlignment.CENTER),
-                                        bgcolor=status_color,
-                                        padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                                        border_radius=12
-                                    )
-                                ],
-                                alignment=ft.MainAxisAlignment.SPACE_BETWEEN
-                            ),
-                            ft.Text(
-                                jc.get('title', 'N/A'),
-                                size=14,
-                                color=ft.Colors.BLACK,
-                                max_lines=2,
-                                overflow=ft.TextOverflow.ELLIPSIS
-                            ),
-                            ft.Text(
-                                f"Created: {self.format_date(jc.get('created_date', 'N/A'))}",
-                                size=12,
-                                color=ft.Colors.BLUE_GREY_600,
-                                max_lines=1
-                            ),
-                            ft.Row(
-                                controls=[
-                                    ft.TextButton(
-                                        text="View",
-                                        icon=ft.Icons.VISIBILITY,
-                                        style=ft.ButtonStyle(
-                                            bgcolor=ft.Colors.BLUE_600,
-                                            color=ft.Colors.WHITE,
-                                            shape=ft.RoundedRectangleBorder(radius=8),
-                                            overlay_color=ft.Colors.BLUE_800,
-                                            elevation={"pressed": 2, "": 6}
-                                        ),
-                                        on_click=lambda e, jc=jc: self.page.run_task(self.show_job_card_detail, jc)
-                                    )
-                                ],
-                                alignment=ft.MainAxisAlignment.END
-                            )
-                        ],
-                        spacing=8
-                    ),
-                    padding=ft.padding.all(12),
-                    bgcolor=ft.Colors.WHITE
-                ),
-                width=360,
-                elevation=3,
-                shape=ft.RoundedRectangleBorder(radius=10),
-                opacity=0,
-                animate_opacity=ft.Animation(400, ft.AnimationCurve.EASE_IN_OUT)
-            )
-            card.opacity = 1  # Trigger fade-in animation
+            if jc['id'] in self.job_card_controls:
+                card, parts = self.job_card_controls[jc['id']]
+                self.patch_job_card(parts, jc)
+            else:
+                card, parts = self.create_job_card(jc)
+            controls[jc['id']] = (card, parts)
             cards.append(card)
+        # Cards that are no longer listed drop out here and are removed from the ListView on update
+        self.job_card_controls = controls
         return cards
 
+    def create_job_card(self, jc):
+        """Create the card control for a single job card, returning it with its patchable parts."""
+        status_color = JOB_CARD_STATUS_COLORS.get(jc.get('status', ''), ft.Colors.GREY_600)
+        status_icon = JOB_CARD_STATUS_ICONS.get(jc.get('status', ''), ft.Icons.INFO)
+        parts = {'job_card': jc}
+        parts['job_number'] = ft.Text(
+            jc.get('job_number', 'N/A'),
+            size=16,
+            weight=ft.FontWeight.BOLD,
+            color=ft.Colors.BLUE_900,
+            max_lines=1,
+            overflow=ft.TextOverflow.ELLIPSIS
+        )
+        parts['status_icon'] = ft.Icon(status_icon, size=14, color=ft.Colors.WHITE)
+        parts['status_text'] = ft.Text(jc.get('status', 'N/A'), size=12, color=ft.Colors.WHITE)
+        parts['status_badge'] = ft.Container(
+            content=ft.Row([
+                parts['status_icon'],
+                parts['status_text']
+            ], spacing=5, alignment=ft.MainAxisAlignment.CENTER),
+            bgcolor=status_color,
+            padding=ft.padding.symmetric(horizontal=8, vertical=4),
+            border_radius=12
+        )
+        parts['title'] = ft.Text(
+            jc.get('title', 'N/A'),
+            size=14,
+            color=ft.Colors.BLACK,
+            max_lines=2,
+            overflow=ft.TextOverflow.ELLIPSIS
+        )
+        parts['created'] = ft.Text(
+            f"Created: {self.format_date(jc.get('created_date', 'N/A'))}",
+            size=12,
+            color=ft.Colors.BLUE_GREY_600,
+            max_lines=1
+        )
+        card = ft.Card(
+            content=ft.Container(
+                content=ft.Column(
+                    controls=[
+                        ft.Row(
+                            controls=[
+                                parts['job_number'],
+                                parts['status_badge']
+                            ],
+                            alignment=ft.MainAxisAlignment.SPACE_BETWEEN
+                        ),
+                        parts['title'],
+                        parts['created'],
+                        ft.Row(
+                            controls=[
+                                ft.TextButton(
+                                    text="View",
+                                    icon=ft.Icons.VISIBILITY,
+                                    style=ft.ButtonStyle(
+                                        bgcolor=ft.Colors.BLUE_600,
+                                        color=ft.Colors.WHITE,
+                                        shape=ft.RoundedRectangleBorder(radius=8),
+                                        overlay_color=ft.Colors.BLUE_800,
+                                        elevation={"pressed": 2, "": 6}
+                                    ),
+                                    # Read the job card through parts so patched cards open their latest data
+                                    on_click=lambda e, parts=parts: self.page.run_task(self.show_job_card_detail, parts['job_card'])
+                                )
+                            ],
+                            alignment=ft.MainAxisAlignment.END
+                        )
+                    ],
+                    spacing=8
+                ),
+                padding=ft.padding.all(12),
+                bgcolor=ft.Colors.WHITE
+            ),
+            width=360,
+            elevation=3,
+            shape=ft.RoundedRectangleBorder(radius=10),
+            opacity=0,
+            animate_opacity=ft.Animation(400, ft.AnimationCurve.EASE_IN_OUT)
+        )
+        card.opacity = 1  # Trigger fade-in animation
+        self.job_card_controls[jc['id']] = (card, parts)
+        return card, parts
+
+    def patch_job_card(self, parts, jc):
+        """Update an existing card in place; Flet only sends the properties whose values changed."""
+        parts['job_card'] = jc
+        parts['job_number'].value = jc.get('job_number', 'N/A')
+        parts['status_icon'].name = JOB_CARD_STATUS_ICONS.get(jc.get('status', ''), ft.Icons.INFO)
+        parts['status_text'].value = jc.get('status', 'N/A')
+        parts['status_badge'].bgcolor = JOB_CARD_STATUS_COLORS.get(jc.get('status', ''), ft.Colors.GREY_600)
+        parts['title'].value = jc.get('title', 'N/A')
+        parts['created'].value = f"Created: {self.format_date(jc.get('created_date', 'N/A'))}"
+
     def format_date(self, date_str):
         """Format date string or return as-is if invalid."""
         if not date_str or date_str == 'N/A':
@@ -675,84 +943,110 @@ class JobCardPage(ft.Container):
         except ValueError:
             return date_str
 
-    async def show_job_card_detail(self, job_card):
-        """Display job card details in a modern dialog."""
-        try:
-            created_date = self.format_date(job_card.get('created_date', 'N/A'))
-            started_date = self.format_date(job_card.get('started_date', 'N/A'))
-            completed_date = self.format_date(job_card.get('completed_date', 'N/A'))
-
-            dialog_content = ft.Column(
-                controls=[
-                    ft.Text(f"Job No: {job_card.get('job_number', 'N/A')}", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                    ft.Text(f"ID: {job_card.get('id', 'N/A')}", size=14, color=ft.Colors.BLUE_GREY_600),
-                    ft.Text(f"Title:", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                    ft.Text(job_card.get('title', 'N/A'), size=14, color=ft.Colors.BLACK, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
-                    ft.Text(f"Description:", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                    ft.Text(job_card.get('description', 'N/A'), size=14, color=ft.Colors.BLACK, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS),
-                    ft.Text(f"Department: {job_card.get('department_name', 'N/A')}", size=14, color=ft.Colors.BLACK),
-                    ft.Text(f"Entity: {job_card.get('entity_info', 'N/A')}", size=14, color=ft.Colors.BLACK, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
-                    ft.Text(f"Closure: {job_card.get('closure_details', 'N/A')}", size=14, color=ft.Colors.BLACK, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS),
-                    ft.Text(f"Created: {created_date}", size=14, color=ft.Colors.BLACK),
-                    ft.Text(f"Started: {started_date}", size=14, color=ft.Colors.BLACK),
-                    ft.Text(f"Completed: {completed_date}", size=14, color=ft.Colors.BLACK),
-                    ft.Text(f"Status: {job_card.get('status', 'N/A')}", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800)
-                ],
-                spacing=8,
-                scroll=ft.ScrollMode.AUTO
+    def build_detail_dialog_view(self):
+        """Build the job card detail dialog once; show_job_card_detail only fills in the values."""
+        texts = {
+            "job_number": ft.Text(size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
+            "id": ft.Text(size=14, color=ft.Colors.BLUE_GREY_600),
+            "title": ft.Text(size=14, color=ft.Colors.BLACK, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
+            "description": ft.Text(size=14, color=ft.Colors.BLACK, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS),
+            "department": ft.Text(size=14, color=ft.Colors.BLACK),
+            "entity": ft.Text(size=14, color=ft.Colors.BLACK, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
+            "closure": ft.Text(size=14, color=ft.Colors.BLACK, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS),
+            "created": ft.Text(size=14, color=ft.Colors.BLACK),
+            "started": ft.Text(size=14, color=ft.Colors.BLACK),
+            "completed": ft.Text(size=14, color=ft.Colors.BLACK),
+            "status": ft.Text(size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800)
+        }
+        dialog_content = ft.Column(
+            controls=[
+                texts["job_number"],
+                texts["id"],
+                ft.Text(f"Title:", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
+                texts["title"],
+                ft.Text(f"Description:", size=14, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
+                texts["description"],
+                texts["department"],
+                texts["entity"],
+                texts["closure"],
+                texts["created"],
+                texts["started"],
+                texts["completed"],
+                texts["status"]
+            ],
+            spacing=8,
+            scroll=ft.ScrollMode.AUTO
+        )
+        title = ft.Text(f"Job Card Details", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800)
+        content = ft.Container(
+            content=dialog_content,
+            width=340,
+            height=400,
+            padding=ft.padding.all(12),
+            bgcolor=ft.Colors.WHITE,
+            border_radius=10,
+            border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
+            shadow=ft.BoxShadow(
+                spread_radius=1,
+                blur_radius=5,
+                color=ft.Colors.BLUE_GREY_200,
+                offset=ft.Offset(0, 2)
             )
-
-            dialog = ft.AlertDialog(
-                modal=True,
-                title=ft.Text(f"Job Card Details", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                content=ft.Container(
-                    content=dialog_content,
-                    width=340,
-                    height=400,
-                    padding=ft.padding.all(12),
-                    bgcolor=ft.Colors.WHITE,
-                    border_radius=10,
-                    border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
-                    shadow=ft.BoxShadow(
-                        spread_radius=1,
-                        blur_radius=5,
-                        color=ft.Colors.BLUE_GREY_200,
-                        offset=ft.Offset(0, 2)
-                    )
-                ),
-                actions=[
-                    ft.TextButton(
-                        "Close",
-                        on_click=self.close_dialog,
-                        style=ft.ButtonStyle(
-                            bgcolor=ft.Colors.BLUE_600,
-                            color=ft.Colors.WHITE,
-                            shape=ft.RoundedRectangleBorder(radius=8),
-                            overlay_color=ft.Colors.BLUE_800,
-                            elevation={"pressed": 2, "": 6}
-                        )
-                    )
-                ],
-                actions_alignment=ft.MainAxisAlignment.END,
-                bgcolor=ft.Colors.BLUE_GREY_50,
-                shape=ft.RoundedRectangleBorder(radius=10)
+        )
+        actions = [
+            ft.TextButton(
+                "Close",
+                on_click=self.close_dialog,
+                style=ft.ButtonStyle(
+                    bgcolor=ft.Colors.BLUE_600,
+                    color=ft.Colors.WHITE,
+                    shape=ft.RoundedRectangleBorder(radius=8),
+                    overlay_color=ft.Colors.BLUE_800,
+                    elevation={"pressed": 2, "": 6}
+                )
             )
+        ]
+        return title, content, actions, texts
 
-            self.page.dialog = dialog
-            dialog.open = True
-            self.page.overlay.append(dialog)
+    async def show_job_card_detail(self, job_card):
+        """Display job card details in a modern dialog."""
+        try:
+            if self.detail_dialog_view is None:
+                self.detail_dialog_view = self.build_detail_dialog_view()
+            title, content, actions, texts = self.detail_dialog_view
+            texts["job_number"].value = f"Job No: {job_card.get('job_number', 'N/A')}"
+            texts["id"].value = f"ID: {job_card.get('id', 'N/A')}"
+            texts["title"].value = job_card.get('title', 'N/A')
+            texts["description"].value = job_card.get('description', 'N/A')
+            texts["department"].value = f"Department: {job_card.get('department_name', 'N/A')}"
+            texts["entity"].value = f"Entity: {job_card.get('entity_info', 'N/A')}"
+            texts["closure"].value = f"Closure: {job_card.get('closure_details', 'N/A')}"
+            texts["created"].value = f"Created: {self.format_date(job_card.get('created_date', 'N/A'))}"
+            texts["started"].value = f"Started: {self.format_date(job_card.get('started_date', 'N/A'))}"
+            texts["completed"].value = f"Completed: {self.format_date(job_card.get('completed_date', 'N/A'))}"
+            texts["status"].value = f"Status: {job_card.get('status', 'N/A')}"
+            self.open_dialog(title, content, actions)
             self.safe_update("show_job_card_detail")
         except Exception as e:
             self.show_snack_bar(f"Error opening job card details: {e}", ft.Colors.RED_800)
 
+    def open_dialog(self, title, content, actions):
+        """Show the page's shared dialog with the given title, content and actions."""
+        # Re-attaches the dialog if a route change cleared the overlay
+        self.dialog = get_dialog(self.page)
+        self.dialog.title = title
+        self.dialog.content = content
+        self.dialog.actions = actions
+        self.dialog.open = True
+
     async def close_dialog(self, e):
         """Close the active dialog."""
-        if self.page.dialog:
-            self.page.dialog.open = False
+        if self.dialog.open:
+            self.dialog.open = False
             self.safe_update("close_dialog")
 
-    async def open_job_card_dialog(self, e=None):
-        """Open dialog to create a new job card for user's department."""
+    def build_create_dialog_view(self):
+        """Build the create job card dialog once; open_job_card_dialog resets it for every use."""
         self.job_title = ft.TextField(
             label="Job Title",
             hint_text="Enter job title",
@@ -778,8 +1072,6 @@ class JobCardPage(ft.Container):
         )
         self.department_dropdown = ft.Dropdown(
             label="Department",
-            options=[ft.dropdown.Option(key=str(d['id']), text=d['name']) for d in self.departments],
-            value=str(self.departments[0]['id']) if self.departments else None,
             border_color=ft.Colors.BLUE_300,
             color=ft.Colors.BLUE_900,
             text_size=14,
@@ -789,68 +1081,71 @@ class JobCardPage(ft.Container):
             bgcolor=ft.Colors.WHITE,
             border_radius=8
         )
-
-        dialog = ft.AlertDialog(
-            modal=True,
-            title=ft.Text("Create Job Card", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-            content=ft.Container(
-                content=ft.Column(
-                    controls=[
-                        self.job_title,
-                        self.job_description,
-                        self.department_dropdown
-                    ],
-                    spacing=12,
-                    scroll=ft.ScrollMode.AUTO
-                ),
-                width=340,
-                height=320,
-                padding=ft.padding.all(12),
-                bgcolor=ft.Colors.WHITE,
-                border_radius=10,
-                border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
-                shadow=ft.BoxShadow(
-                    spread_radius=1,
-                    blur_radius=5,
-                    color=ft.Colors.BLUE_GREY_200,
-                    offset=ft.Offset(0, 2)
+        title = ft.Text("Create Job Card", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800)
+        content = ft.Container(
+            content=ft.Column(
+                controls=[
+                    self.job_title,
+                    self.job_description,
+                    self.department_dropdown
+                ],
+                spacing=12,
+                scroll=ft.ScrollMode.AUTO
+            ),
+            width=340,
+            height=320,
+            padding=ft.padding.all(12),
+            bgcolor=ft.Colors.WHITE,
+            border_radius=10,
+            border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
+            shadow=ft.BoxShadow(
+                spread_radius=1,
+                blur_radius=5,
+                color=ft.Colors.BLUE_GREY_200,
+                offset=ft.Offset(0, 2)
+            )
+        )
+        actions = [
+            ft.TextButton(
+                "Cancel",
+                on_click=self.close_dialog,
+                style=ft.ButtonStyle(
+                    bgcolor=ft.Colors.GREY_600,
+                    color=ft.Colors.WHITE,
+                    shape=ft.RoundedRectangleBorder(radius=8),
+                    overlay_color=ft.Colors.GREY_800,
+                    elevation={"pressed": 2, "": 6}
                 )
             ),
-            actions=[
-                ft.TextButton(
-                    "Cancel",
-                    on_click=self.close_dialog,
-                    style=ft.ButtonStyle(
-                        bgcolor=ft.Colors.GREY_600,
-                        color=ft.Colors.WHITE,
-                        shape=ft.RoundedRectangleBorder(radius=8),
-                        overlay_color=ft.Colors.GREY_800,
-                        elevation={"pressed": 2, "": 6}
-                    )
-                ),
-                ft.TextButton(
-                    "Save",
-                    on_click=self.save_job_card,
-                    style=ft.ButtonStyle(
-                        bgcolor=ft.Colors.TEAL_600,
-                        color=ft.Colors.WHITE,
-                        shape=ft.RoundedRectangleBorder(radius=8),
-                        overlay_color=ft.Colors.TEAL_800,
-                        elevation={"pressed": 2, "": 6}
-                    )
+            ft.TextButton(
+                "Save",
+                on_click=self.save_job_card,
+                style=ft.ButtonStyle(
+                    bgcolor=ft.Colors.TEAL_600,
+                    color=ft.Colors.WHITE,
+                    shape=ft.RoundedRectangleBorder(radius=8),
+                    overlay_color=ft.Colors.TEAL_800,
+                    elevation={"pressed": 2, "": 6}
                 )
-            ],
-            actions_alignment=ft.MainAxisAlignment.END,
-            bgcolor=ft.Colors.BLUE_GREY_50,
-            shape=ft.RoundedRectangleBorder(radius=10)
-        )
-        self.page.dialog = dialog
-        dialog.open = True
-        self.page.overlay.append(dialog)
+            )
+        ]
+        return title, content, actions
+
+    async def open_job_card_dialog(self, e=None):
+        """Open dialog to create a new job card for user's department."""
+        if self.create_dialog_view is None:
+            self.create_dialog_view = self.build_create_dialog_view()
+        self.job_title.value = ""
+        self.job_description.value = ""
+        options = [(str(d['id']), d['name']) for d in self.departments]
+        if options != [(option.key, option.text) for option in self.department_dropdown.options]:
+            self.department_dropdown.options = [ft.dropdown.Option(key=key, text=text) for key, text in options]
+        self.department_dropdown.value = options[0][0] if options else None
+        self.open_dialog(*self.create_dialog_view)
         self.safe_update("open_job_card_dialog")
 
     async def save_job_card(self, e):
-        """Save a new job card to SQLite and MySQL if online."""
+        """Save a new job card locally and queue it for upload to MySQL."""
         title = self.job_title.value.strip() if self.job_title.value else ""
         description = self.job_description.value.strip() if self.job_description.value else ""
         department_id = self.department_dropdown.value
@@ -860,149 +1155,104 @@ class JobCardPage(ft.Container):
             await self.close_dialog(None)
             return
 
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys"
-        }
+        try:
+            saved, message = await run_db(self.write_job_card, title, description, department_id)
+        except (sqlite3.Error, mysql.connector.Error) as e:
+            saved, message = False, f"Error saving job card: {e}"
+        if not saved:
+            self.show_snack_bar(message, ft.Colors.RED_800)
+            await self.close_dialog(None)
+            return
+
+        self.show_snack_bar(message, ft.Colors.TEAL_600)
+        await self.load_job_cards()
+        await self.close_dialog(None)
+        self.play_beep()
+
+    def write_job_card(self, title, description, department_id):
+        """Number the job card and commit it locally together with its outbox entry; returns (saved, message) (blocking)."""
         conn_sqlite = None
         cursor_sqlite = None
-        conn_mysql = None
-        cursor_mysql = None
-        max_attempts = 10
-        attempt = 0
-        job_id = None
-        job_number = None
-        is_offline = not self.is_online()
-
         try:
-            conn_sqlite = sqlite3.connect(self.sqlite_db_path)
+            conn_sqlite = get_sqlite_connection()
             cursor_sqlite = conn_sqlite.cursor()
-            cursor_sqlite.execute("PRAGMA foreign_keys = ON")
             cursor_sqlite.execute("SELECT name FROM department WHERE id = ?", (department_id,))
             department_data = cursor_sqlite.fetchone()
             if not department_data:
-                self.show_snack_bar("Invalid department selected.", ft.Colors.RED_800)
-                await self.close_dialog(None)
-                return
+                return False, "Invalid department selected."
             department_name = department_data[0]
 
-            department_prefix = re.sub(r'[^a-zA-Z0-9]', '', department_name)[:10]
+            department_prefix = job_number_prefix(department_name)
             current_date = datetime.now().strftime('%Y%m%d')
-            while attempt < max_attempts:
+            count = self.take_reserved_job_sequence(cursor_sqlite, department_prefix, current_date)
+            if count is None and self.is_online():
+                # The no-op UPDATE above still opened a write transaction; don't hold the lock across the network call
+                conn_sqlite.rollback()
+                # Block used up: reserving the next one is the only network call a save can make
                 try:
-                    if not is_offline:
-                        conn_mysql = mysql.connector.connect(**db_config)
-                        cursor_mysql = conn_mysql.cursor()
-                        substring_start = len(department_prefix) + 10
-                        cursor_mysql.execute("""
-                            SELECT MAX(CAST(SUBSTRING(job_number, %s) AS UNSIGNED))
-                            FROM job_cards
-                            WHERE job_number LIKE %s
-                        """, (substring_start, f"{department_prefix}{current_date}-%"))
-                        max_sequence = cursor_mysql.fetchone()[0]
-                        count = (max_sequence or 0) + 1
-                        job_number = f"{department_prefix}{current_date}-{count:04d}"
-                        job_id = int(f"{department_id}{current_date}{count:04d}")
-                        cursor_mysql.execute("SELECT id FROM job_cards WHERE id = %s OR job_number = %s", (job_id, job_number))
-                        if cursor_mysql.fetchone():
-                            attempt += 1
-                            continue
-                    else:
-                        substring_start = len(department_prefix) + 10
-                        cursor_sqlite.execute("""
-                            SELECT MAX(CAST(SUBSTRING(job_number, ?) AS INTEGER))
-                            FROM job_cards
-                            WHERE job_number LIKE ?
-                        """, (substring_start, f"{department_prefix}{current_date}-%"))
-                        max_sequence = cursor_sqlite.fetchone()[0]
-                        count = (max_sequence or 0) + 1
-                        job_number = f"{department_prefix}{current_date}-{count:04d}-D{self.device_id}"
-                        job_id = int(f"{department_id}{current_date}{count:04d}")
-
-                    if len(job_number) > 30:
-                        self.show_snack_bar(f"Job number {job_number} too long for {department_name}", ft.Colors.RED_800)
-                        await self.close_dialog(None)
-                        return
-                    break
-                except mysql.connector.Error as mysql_err:
-                    if attempt == max_attempts - 1:
-                        is_offline = True
-                        self.show_snack_bar("MySQL unavailable: Using device-specific job number", ft.Colors.YELLOW_800)
-                        substring_start = len(department_prefix) + 10
-                        cursor_sqlite.execute("""
-                            SELECT MAX(CAST(SUBSTRING(job_number, ?) AS INTEGER))
-                            FROM job_cards
-                            WHERE job_number LIKE ?
-                        """, (substring_start, f"{department_prefix}{current_date}-%"))
-                        max_sequence = cursor_sqlite.fetchone()[0]
-                        count = (max_sequence or 0) + 1
-                        job_number = f"{department_prefix}{current_date}-{count:04d}-D{self.device_id}"
-                        job_id = int(f"{department_id}{current_date}{count:04d}")
-                        if len(job_number) > 30:
-                            self.show_snack_bar(f"Offline job number {job_number} too long for {department_name}", ft.Colors.RED_800)
-                            await self.close_dialog(None)
-                            return
-                        break
-                    attempt += 1
-                finally:
-                    if cursor_mysql:
-                        cursor_mysql.close()
-                    if conn_mysql:
-                        conn_mysql.close()
-
-            if attempt >= max_attempts and not is_offline:
-                self.show_snack_bar("Unable to generate unique job ID after multiple attempts.", ft.Colors.RED_800)
-                await self.close_dialog(None)
-                return
+                    self.refresh_offline_block(department_prefix)
+                    count = self.take_reserved_job_sequence(cursor_sqlite, department_prefix, current_date)
+                except mysql.connector.Error as e:
+                    print(f"Error reserving offline job numbers: {e}")
+            if count is not None:
+                job_number = f"{department_prefix}{current_date}-{count:04d}"
+                job_id = int(f"{department_id}{current_date}{count:04d}")
+            else:
+                # No reserved number left for today: fall back to a device-suffixed number renamed on upload
+                substring_start = len(department_prefix) + 10
+                cursor_sqlite.execute(
+                    MAX_DAY_SEQUENCE_SQL,
+                    (substring_start, f"{department_prefix}{current_date}-", f"{department_prefix}{current_date}.")
+                )
+                max_sequence = cursor_sqlite.fetchone()[0]
+                count = (max_sequence or 0) + 1
+                job_number = f"{department_prefix}{current_date}-{count:04d}-D{self.device_id}"
+                # The server may issue the same id; a negative placeholder can't be overwritten by a sync
+                # before the upload renumbers the card from the server counter
+                job_id = -int(f"{department_id}{current_date}{count:04d}")
+            if len(job_number) > 30:
+                return False, f"Job number {job_number} too long for {department_name}"
 
-            cursor_sqlite.execute("SELECT id FROM job_cards WHERE id = ? OR job_number = ?", (job_id, job_number))
+            cursor_sqlite.execute(JOB_CARD_EXISTS_SQL, (job_id, job_number))
             if cursor_sqlite.fetchone():
-                self.show_snack_bar("Duplicate job ID or number in SQLite. Try again.", ft.Colors.RED_800)
-                await self.close_dialog(None)
-                return
+                return False, "Duplicate job ID or number in SQLite. Try again."
 
             cursor_sqlite.execute("""
-                INSERT INTO job_cards (id, job_number, title, description, status, created_date, department_name)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (job_id, job_number, title, description, "Open", datetime.now().strftime('%Y-%m-%d %H:%M:%S'), department_name))
+                INSERT INTO job_cards (id, job_number, title, description, status, created_date, department_name,
+                                       origin_device, pending_upload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """, (
+                job_id, job_number, title, description, "Open", datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                department_name, self.device_id
+            ))
+            # Delivery to MySQL is the outbox uploader's job; the card and its entry commit together
+            enqueue_job_card(conn_sqlite, job_id)
             conn_sqlite.commit()
-
-            if not is_offline:
-                conn_mysql = mysql.connector.connect(**db_config)
-                cursor_mysql = conn_mysql.cursor()
-                cursor_mysql.execute("""
-                    INSERT INTO job_cards (id, job_number, title, description, status, created_date, department_name)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (job_id, job_number, title, description, "Open", datetime.now().strftime('%Y-%m-%d %H:%M:%S'), department_name))
-                conn_mysql.commit()
-
-            self.show_snack_bar("Job card created successfully!", ft.Colors.TEAL_600)
-            await self.load_job_cards()
-            await self.close_dialog(None)
-            try:
-                audio = Audio(src="assets/beep.mp3", autoplay=True, on_state_changed=self.remove_audio)
-                self.page.overlay.append(audio)
-                self.safe_update("play_save_audio")
-            except Exception as e:
-                self.show_snack_bar(f"Error playing audio: {e}", ft.Colors.RED_800)
-        except (sqlite3.Error, mysql.connector.Error) as e:
-            self.show_snack_bar(f"Error saving job card: {e}", ft.Colors.RED_800)
-            await self.close_dialog(None)
         finally:
             if cursor_sqlite:
                 cursor_sqlite.close()
             if conn_sqlite:
-                conn_sqlite.close()
-            if cursor_mysql:
-                cursor_mysql.close()
-            if conn_mysql:
-                conn_mysql.close()
+                release_sqlite_connection(conn_sqlite)
+        get_outbox_uploader().request_drain()
+        if self.is_online():
+            return True, "Job card created successfully!"
+        return True, "Job card saved offline; it will upload when the server is reachable."
+
+    def take_reserved_job_sequence(self, cursor_sqlite, department, day):
+        """Take the next number from the block reserved for department and day, or None when it is used up."""
+        cursor_sqlite.execute("""
+            UPDATE job_number_blocks SET next_value = next_value + 1
+            WHERE department = ? AND day = ? AND next_value < end_value
+            RETURNING next_value - 1
+        """, (department, day))
+        reserved = cursor_sqlite.fetchone()
+        return reserved[0] if reserved else None
 
     def show_snack_bar(self, message, color=ft.Colors.BLACK):
         """Display a snackbar with the given message and color."""
+        self.snack_bar = get_snack_bar(self.page)
         self.snack_bar.content.value = message
         self.snack_bar.bgcolor = color
+        self.snack_bar.duration = 6000
         self.snack_bar.open = True
         self.safe_update("show_snack_bar")
@@ -0,0 +1,354 @@
+import os
+import shutil
+import sqlite3
+import threading
+
+# Packaged apps get a writable data directory that survives updates; fall back to the project folder
+APP_DATA_DIR = os.getenv("FLET_APP_STORAGE_DATA") or os.path.dirname(os.path.abspath(__file__))
+
+# Local database shared by the login and job card pages
+SQLITE_DB_PATH = os.path.join(APP_DATA_DIR, "job_cards.db")
+# Copy shipped with the app, used to seed SQLITE_DB_PATH on first run
+BUNDLED_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_cards.db")
+
+# Connection tuning, sized for phones: 8 MiB page cache, 64 MiB memory map
+SQLITE_CACHE_SIZE_KIB = 8192
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024
+SQLITE_CACHED_STATEMENTS = 128
+SQLITE_BUSY_TIMEOUT = 5
+
+
+def enable_wal(conn):
+    """Switch the database to write-ahead logging (persists in the database file)."""
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+def migration_001_base_schema(conn):
+    """Create the tables used by the login and job card pages."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS department (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT,
+            created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            emp_id TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            name TEXT NOT NULL,
+            department_name TEXT NOT NULL,
+            can_login INTEGER NOT NULL,
+            FOREIGN KEY (department_name) REFERENCES department(name) ON DELETE RESTRICT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_cards (
+            id INTEGER PRIMARY KEY,
+            job_number TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            started_date TEXT,
+            completed_date TEXT,
+            entity_type TEXT,
+            entity_id INTEGER,
+            closure_details TEXT,
+            department_name TEXT NOT NULL,
+            FOREIGN KEY (department_name) REFERENCES department(name) ON DELETE RESTRICT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS entity_cache (
+            entity_type TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (entity_type, entity_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            department_name TEXT PRIMARY KEY,
+            last_modified TEXT,
+            last_synced_at TEXT
+        )
+    ''')
+
+
+def migration_002_job_cards_upload_tracking(conn):
+    """Add the upload-tracking columns and the indexes behind the hot job_cards queries."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(job_cards)")}
+    if "origin_device" not in columns:
+        conn.execute("ALTER TABLE job_cards ADD COLUMN origin_device TEXT")
+    if "pending_upload" not in columns:
+        conn.execute("ALTER TABLE job_cards ADD COLUMN pending_upload INTEGER NOT NULL DEFAULT 0")
+        # Offline cards were only recognisable by their "-D<device>" job number suffix
+        conn.execute("""
+            UPDATE job_cards
+            SET pending_upload = 1, origin_device = substr(job_number, -4)
+            WHERE job_number GLOB '*-D[0-9a-f][0-9a-f][0-9a-f][0-9a-f]'
+        """)
+    # Department list (optionally by status), newest first; rowid (id) is the implicit last key
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_cards_department_created ON job_cards (department_name, created_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_cards_department_status_created ON job_cards (department_name, status, created_date)")
+
+
+def migration_003_offline_job_numbers(conn):
+    """Persist the device id and add the table holding job numbers reserved for offline use."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    import uuid
+    # Generated once per install; offline job numbers and uploads are tied to it
+    conn.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES ('device_id', ?)", (uuid.uuid4().hex[-4:],))
+    # One block of server-reserved sequence numbers per job number prefix and day, next_value up to end_value (exclusive)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_number_blocks (
+            department TEXT NOT NULL,
+            day TEXT NOT NULL,
+            next_value INTEGER NOT NULL,
+            end_value INTEGER NOT NULL,
+            PRIMARY KEY (department, day)
+        )
+    ''')
+
+
+def migration_004_outbox(conn):
+    """Add the outbox of local changes awaiting delivery to MySQL, seeded with cards not uploaded yet."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation TEXT NOT NULL,
+            job_card_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status_next_attempt ON outbox (status, next_attempt_at)")
+    # Renaming a delivered card rewrites its entry by job_card_id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_job_card ON outbox (job_card_id)")
+    conn.execute("""
+        INSERT INTO outbox (operation, job_card_id, created_at)
+        SELECT 'create_job_card', id, strftime('%s', 'now') FROM job_cards WHERE pending_upload = 1
+    """)
+
+
+def migration_005_user_server_timestamps(conn):
+    """Store each synced user's server updated_at so later syncs only rewrite and re-hash changed users."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    if "server_updated_at" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN server_updated_at TEXT")
+
+
+def migration_006_job_card_search(conn):
+    """Add the FTS5 index behind job card search, kept in step with job_cards by triggers.
+
+    Builds without FTS5 skip it; searches then fall back to LIKE (see has_job_card_search).
+    """
+    try:
+        conn.execute("SAVEPOINT job_card_search")
+        # External content: the index stores only tokens, the text stays in job_cards; prefix indexes serve search-as-you-type
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS job_cards_fts USING fts5(
+                job_number, title, description, closure_details,
+                content='job_cards', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        conn.execute("ROLLBACK TO job_card_search")
+        conn.execute("RELEASE job_card_search")
+        return
+    conn.execute("RELEASE job_card_search")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS job_cards_fts_insert AFTER INSERT ON job_cards BEGIN
+            INSERT INTO job_cards_fts (rowid, job_number, title, description, closure_details)
+            VALUES (new.id, new.job_number, new.title, new.description, new.closure_details);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS job_cards_fts_delete AFTER DELETE ON job_cards BEGIN
+            INSERT INTO job_cards_fts (job_cards_fts, rowid, job_number, title, description, closure_details)
+            VALUES ('delete', old.id, old.job_number, old.title, old.description, old.closure_details);
+        END
+    """)
+    # Sync upserts rewrite every column; the WHEN clause skips re-indexing rows whose text didn't change
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS job_cards_fts_update AFTER UPDATE OF job_number, title, description, closure_details ON job_cards
+        WHEN old.job_number IS NOT new.job_number OR old.title IS NOT new.title
+          OR old.description IS NOT new.description OR old.closure_details IS NOT new.closure_details
+        BEGIN
+            INSERT INTO job_cards_fts (job_cards_fts, rowid, job_number, title, description, closure_details)
+            VALUES ('delete', old.id, old.job_number, old.title, old.description, old.closure_details);
+            INSERT INTO job_cards_fts (rowid, job_number, title, description, closure_details)
+            VALUES (new.id, new.job_number, new.title, new.description, new.closure_details);
+        END
+    """)
+    conn.execute("INSERT INTO job_cards_fts (job_cards_fts) VALUES ('rebuild')")
+
+
+# Applied in order; the database's PRAGMA user_version is the number already applied.
+# Append new migrations here, never edit or reorder shipped ones.
+MIGRATIONS = [
+    migration_001_base_schema,
+    migration_002_job_cards_upload_tracking,
+    migration_003_offline_job_numbers,
+    migration_004_outbox,
+    migration_005_user_server_timestamps,
+    migration_006_job_card_search,
+]
+
+
+def migrate(conn):
+    """Bring the schema up to date, one transaction per pending migration; returns the schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRATIONS):
+        return version
+    # journal_mode can't change inside a transaction, and persists in the file once set
+    enable_wal(conn)
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(MIGRATIONS)
+
+
+def reset_device_identity(conn):
+    """Give a database copied from elsewhere its own device id and drop the job number blocks reserved for the old one."""
+    import uuid
+    with conn:
+        conn.execute("UPDATE app_settings SET value = ? WHERE key = 'device_id'", (uuid.uuid4().hex[-4:],))
+        conn.execute("DELETE FROM job_number_blocks")
+
+
+def migrate_database(path=SQLITE_DB_PATH):
+    """Seed the database from the bundled copy if it doesn't exist yet, then apply pending migrations."""
+    seeded = False
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(BUNDLED_DB_PATH) and os.path.abspath(BUNDLED_DB_PATH) != os.path.abspath(path):
+            shutil.copyfile(BUNDLED_DB_PATH, path)
+            seeded = True
+    conn = sqlite3.connect(path)
+    try:
+        version = migrate(conn)
+        # The bundled copy may have been opened in place during development and carry that device's id
+        if seeded:
+            reset_device_identity(conn)
+        return version
+    finally:
+        conn.close()
+
+
+def open_sqlite_connection(path=SQLITE_DB_PATH):
+    """Open a connection with the per-connection PRAGMAs the app relies on."""
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, cached_statements=SQLITE_CACHED_STATEMENTS)
+    conn.execute("PRAGMA foreign_keys = ON")
+    # Safe with WAL: a power loss can drop the last commits but never corrupts the database
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+_sqlite_local = threading.local()
+
+
+def get_sqlite_connection():
+    """Return this thread's long-lived connection to the local database, opening it on first use.
+
+    sqlite3 connections must stay on the thread that created them, so each database worker
+    keeps its own; WAL lets them read concurrently while one of them writes.
+    """
+    conn = getattr(_sqlite_local, "conn", None)
+    if conn is None:
+        conn = open_sqlite_connection()
+        _sqlite_local.conn = conn
+    return conn
+
+
+def release_sqlite_connection(conn):
+    """Hand a connection from get_sqlite_connection back, rolling back anything left uncommitted."""
+    if conn.in_transaction:
+        conn.rollback()
+
+
+_device_id = None
+
+
+def get_device_id():
+    """Return the id this install stamps on offline job cards, read once from app_settings."""
+    global _device_id
+    if _device_id is None:
+        conn = get_sqlite_connection()
+        row = conn.execute("SELECT value FROM app_settings WHERE key = 'device_id'").fetchone()
+        _device_id = row[0]
+    return _device_id
+
+
+_has_job_card_search = None
+
+
+def has_job_card_search(conn):
+    """Return whether the FTS5 job card index exists, checked once per process."""
+    global _has_job_card_search
+    if _has_job_card_search is None:
+        _has_job_card_search = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_cards_fts'"
+        ).fetchone() is not None
+    return _has_job_card_search
+
+
+def bulk_upsert(conn, table, columns, rows, key_columns=("id",)):
+    """Insert or update rows with one executemany inside a single transaction.
+
+    The rows join the caller's transaction only when one is already open (conn.in_transaction,
+    e.g. after an explicit BEGIN); `with conn:` alone doesn't open one. Otherwise the savepoint
+    starts its own transaction and commits the rows when it is released.
+
+    Rows that violate another constraint (e.g. a UNIQUE job_number) are skipped and
+    returned, while the remaining rows are still written in the same transaction.
+    """
+    key_list = ", ".join(key_columns)
+    update_list = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key_columns)
+    sql = f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(["?"] * len(columns))})
+        ON CONFLICT({key_list}) DO UPDATE SET {update_list}
+    """
+    failed_rows = []
+    # A savepoint commits on release when it opened the transaction, and nests inside a caller's one
+    conn.execute("SAVEPOINT bulk_upsert")
+    try:
+        try:
+            conn.executemany(sql, rows)
+        except sqlite3.IntegrityError:
+            # Fall back to row-by-row so one bad row doesn't discard the whole batch
+            conn.execute("ROLLBACK TO bulk_upsert")
+            for row in rows:
+                try:
+                    conn.execute(sql, row)
+                except sqlite3.IntegrityError:
+                    failed_rows.append(row)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK TO bulk_upsert")
+        conn.execute("RELEASE bulk_upsert")
+        raise
+    conn.execute("RELEASE bulk_upsert")
+    return failed_rows
@@ -0,0 +1,108 @@
+# Hot SQL the pages and the outbox uploader run against the local SQLite mirror. It lives here so
+# benchmarks/check_query_plans.py explains exactly the statements the app issues.
+
+JOB_CARD_LIST_SQL = """
+    SELECT jc.*, ec.label AS cached_entity_info, ec.fetched_at AS entity_fetched_at
+    FROM job_cards jc
+    LEFT JOIN entity_cache ec ON ec.entity_type = jc.entity_type AND ec.entity_id = jc.entity_id
+    WHERE jc.department_name = ?
+"""
+
+JOB_CARD_SEARCH_SQL = """
+    SELECT jc.*, ec.label AS cached_entity_info, ec.fetched_at AS entity_fetched_at
+    FROM job_cards_fts
+    JOIN job_cards jc ON jc.id = job_cards_fts.rowid
+    LEFT JOIN entity_cache ec ON ec.entity_type = jc.entity_type AND ec.entity_id = jc.entity_id
+    WHERE job_cards_fts MATCH ? AND jc.department_name = ?
+"""
+
+SEARCH_MATCH_COUNT_SQL = "SELECT COUNT(*) FROM job_cards_fts WHERE job_cards_fts MATCH ?"
+
+OPEN_JOB_CARD_COUNT_SQL = "SELECT COUNT(*) FROM job_cards WHERE department_name = ? AND status = 'Open'"
+
+DEPARTMENT_BY_NAME_SQL = "SELECT id, name FROM department WHERE name = ?"
+
+# Range on the job_number unique index instead of a LIKE scan ('.' sorts right after '-')
+MAX_DAY_SEQUENCE_SQL = """
+    SELECT MAX(CAST(SUBSTRING(job_number, ?) AS INTEGER))
+    FROM job_cards
+    WHERE job_number >= ? AND job_number < ?
+"""
+
+JOB_CARD_EXISTS_SQL = "SELECT id FROM job_cards WHERE id = ? OR job_number = ?"
+
+SYNCED_JOB_CARD_IDS_SQL = "SELECT id FROM job_cards WHERE department_name = ? AND pending_upload = 0"
+
+OUTBOX_NEXT_DUE_SQL = """
+    SELECT MIN(o.next_attempt_at)
+    FROM outbox o
+    JOIN job_cards jc ON jc.id = o.job_card_id
+    WHERE o.status = 'pending'
+"""
+
+OUTBOX_PRUNE_SQL = "DELETE FROM outbox WHERE status IN ('sent', 'duplicate', 'rejected') AND sent_at < ?"
+
+RENAME_JOB_CARD_SQL = "UPDATE job_cards SET id = ?, job_number = ?, pending_upload = 0 WHERE id = ?"
+
+RENAME_OUTBOX_JOB_CARD_SQL = "UPDATE outbox SET job_card_id = ? WHERE job_card_id = ?"
+
+# bm25 weights for job_cards_fts columns: job_number, title, description, closure_details
+SEARCH_RANK = "bm25(job_cards_fts, 10.0, 5.0, 1.0, 1.0)"
+
+
+def job_card_list_query(department, status=None, after=None, limit=51, terms=(), match=None, ranked=True):
+    """Return the SQL and params for one page of a department's job cards with their cached entity labels.
+
+    With an FTS5 match the page is ordered by SEARCH_RANK, or newest indexed first unless ranked;
+    other searches LIKE-match each term. Searches continue by offset (after is a count), the plain
+    list by keyset (after is the (created_date, id) of the last card shown).
+    """
+    if match is not None:
+        query = JOB_CARD_SEARCH_SQL
+        params = [match, department]
+        order = f"{SEARCH_RANK}, jc.id DESC" if ranked else "job_cards_fts.rowid DESC"
+    else:
+        query = JOB_CARD_LIST_SQL
+        params = [department]
+        order = "jc.created_date DESC, jc.id DESC"
+        for term in terms:
+            # SQLite builds without FTS5: substring match per term, unranked
+            query += """
+                AND (jc.job_number LIKE ? ESCAPE '\\' OR jc.title LIKE ? ESCAPE '\\'
+                     OR jc.description LIKE ? ESCAPE '\\' OR jc.closure_details LIKE ? ESCAPE '\\')
+            """
+            params += ["%" + term.replace("_", "\\_") + "%"] * 4
+    if status:
+        query += " AND jc.status = ?"
+        params.append(status)
+    if terms:
+        query += f" ORDER BY {order} LIMIT ? OFFSET ?"
+        params += [limit, after or 0]
+    else:
+        if after:
+            # Keyset pagination: continue strictly after the last (created_date, id) shown
+            query += " AND (jc.created_date < ? OR (jc.created_date = ? AND jc.id < ?))"
+            params += [after[0], after[0], after[1]]
+        query += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+def outbox_batch_query(after_outbox_id, now, limit, force=False):
+    """Return the SQL and params for the next pending outbox entries joined to their job cards.
+
+    force also takes entries still waiting out their backoff.
+    """
+    query = """
+        SELECT o.id AS outbox_id, o.attempts, jc.*
+        FROM outbox o
+        JOIN job_cards jc ON jc.id = o.job_card_id
+        WHERE o.status = 'pending' AND o.id > ?
+    """
+    params = [after_outbox_id]
+    if not force:
+        query += " AND o.next_attempt_at <= ?"
+        params.append(now)
+    query += " ORDER BY o.id LIMIT ?"
+    params.append(limit)
+    return query, params
@@ -1,8 +1,9 @@
 import flet as ft
-import mysql.connector
-from mysql.connector import Error
 import sqlite3
-from jobcard_client import JobCardPage  # Import JobCardPage for sync
+from local_db import get_sqlite_connection, release_sqlite_connection
+from overlays import get_snack_bar
+from passwords import hash_password, password_needs_rehash, verify_password
+from user_sync import sync_directory
 
 def login_page(page: ft.Page):
     page.title = "Job Card System - Login"
@@ -16,69 +17,8 @@ def login_page(page: ft.Page):
     # Session management
     page.session.set("user", None)
 
-    # Initialize snackbar
-    snack_bar = ft.SnackBar(
-        content=ft.Text("", size=14, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
-        bgcolor=ft.Colors.BLACK,
-        duration=4000,
-        show_close_icon=True,
-        behavior=ft.SnackBarBehavior.FLOATING,
-        width=340,
-        padding=10,
-        margin=ft.margin.only(bottom=10),
-        shape=ft.RoundedRectangleBorder(radius=8)
-    )
-    page.overlay.append(snack_bar)
-
-    # Initialize SQLite database for departments and users
-    sqlite_db_path = "job_cards.db"
-    def init_sqlite_db():
-        """Initialize SQLite database and create department and users tables."""
-        conn = None
-        cursor = None
-        try:
-            conn = sqlite3.connect(sqlite_db_path)
-            cursor = conn.cursor()
-            # Enable foreign key support
-            cursor.execute("PRAGMA foreign_keys = ON")
-            # Create department table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS department (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL UNIQUE,
-                    description TEXT,
-                    created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
-                    updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
-                )
-            ''')
-            # Create users table with foreign key to department
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    emp_id TEXT PRIMARY KEY,
-                    password TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    department_name TEXT NOT NULL,
-                    can_login INTEGER NOT NULL,
-                    FOREIGN KEY (department_name) REFERENCES department(name) ON DELETE RESTRICT
-                )
-            ''')
-            conn.commit()
-            snack_bar.content.value = "Database initialized successfully!"
-            snack_bar.bgcolor = ft.Colors.TEAL_600
-            snack_bar.open = True
-            page.update()
-        except sqlite3.Error as e:
-            snack_bar.content.value = f"Error initializing database: {e}"
-            snack_bar.bgcolor = ft.Colors.RED_800
-            snack_bar.open = True
-            page.update()
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-
-    init_sqlite_db()
+    # Shared snackbar, re-populated for each message instead of adding one per visit
+    snack_bar = get_snack_bar(page)
 
     # Form fields with enhanced styling for mobile
     emp_id_field = ft.TextField(
@@ -108,69 +48,32 @@ def login_page(page: ft.Page):
     )
 
     def sync_users(e):
-        """Sync departments and users with can_login = 1 from MySQL to SQLite."""
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys",
-            "auth_plugin": "mysql_native_password"
-        }
+        """Apply department and user changes from MySQL to SQLite, login-enabled users only."""
+        # The MySQL driver is only needed once a sync is requested, not to paint the login screen
+        import mysql.connector
+        from db import get_mysql_connection, release_mysql_connection
         conn_mysql = None
-        cursor_mysql = None
         conn_sqlite = None
-        cursor_sqlite = None
+        mysql_broken = False
         try:
-            # Connect to MySQL
-            conn_mysql = mysql.connector.connect(**db_config)
-            cursor_mysql = conn_mysql.cursor(dictionary=True)
-
-            # Sync departments from MySQL to SQLite
-            cursor_mysql.execute("SELECT id, name, description, created_at, updated_at FROM department")
-            departments = cursor_mysql.fetchall()
-            conn_sqlite = sqlite3.connect(sqlite_db_path)
-            cursor_sqlite = conn_sqlite.cursor()
-            cursor_sqlite.execute("PRAGMA foreign_keys = ON")
-            cursor_sqlite.execute("DELETE FROM department")
-            conn_sqlite.commit()
-            for dept in departments:
-                cursor_sqlite.execute("""
-                    INSERT OR REPLACE INTO department (id, name, description, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    dept["id"],
-                    dept["name"],
-                    dept["description"],
-                    dept["created_at"].strftime('%Y-%m-%d %H:%M:%S') if dept["created_at"] else None,
-                    dept["updated_at"].strftime('%Y-%m-%d %H:%M:%S') if dept["updated_at"] else None
-                ))
-            conn_sqlite.commit()
-
-            # Sync users from MySQL to SQLite
-            cursor_mysql.execute(
-                "SELECT emp_id, password, name, department_name, can_login FROM users WHERE can_login = 1"
+            conn_mysql = get_mysql_connection()
+            conn_sqlite = get_sqlite_connection()
+            counts = sync_directory(conn_mysql, conn_sqlite)
+            users = counts["users"]
+            departments = counts["departments"]
+            message = (
+                f"Users: {users['added']} added, {users['updated']} updated, {users['removed']} removed. "
+                f"Departments: {departments['updated']} updated, {departments['removed']} removed."
             )
-            users = cursor_mysql.fetchall()
-            cursor_sqlite.execute("DELETE FROM users")
-            conn_sqlite.commit()
-            for user in users:
-                cursor_sqlite.execute("""
-                    INSERT OR REPLACE INTO users (emp_id, password, name, department_name, can_login)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    user["emp_id"],
-                    user["password"],
-                    user["name"],
-                    user["department_name"],
-                    user["can_login"]
-                ))
-            conn_sqlite.commit()
-
-            snack_bar.content.value = f"Synced {len(departments)} departments and {len(users)} users successfully!"
-            snack_bar.bgcolor = ft.Colors.TEAL_600
+            failed = users["failed"] + departments["failed"]
+            if failed:
+                message += f" {failed} records could not be saved."
+            snack_bar.content.value = message
+            snack_bar.bgcolor = ft.Colors.YELLOW_800 if failed else ft.Colors.TEAL_600
             snack_bar.duration = 4000
             snack_bar.open = True
         except mysql.connector.Error as e:
+            mysql_broken = True
             snack_bar.content.value = f"Error syncing data: {e}"
             snack_bar.bgcolor = ft.Colors.RED_800
             snack_bar.duration = 4000
@@ -181,14 +84,10 @@ def login_page(page: ft.Page):
             snack_bar.duration = 4000
             snack_bar.open = True
         finally:
-            if cursor_mysql:
-                cursor_mysql.close()
             if conn_mysql:
-                conn_mysql.close()
-            if cursor_sqlite:
-                cursor_sqlite.close()
+                release_mysql_connection(conn_mysql, broken=mysql_broken)
             if conn_sqlite:
-                conn_sqlite.close()
+                release_sqlite_connection(conn_sqlite)
             page.update()
 
     def login(e):
@@ -207,29 +106,29 @@ def login_page(page: ft.Page):
         cursor = None
         try:
             # Connect to SQLite for user authentication
-            conn = sqlite3.connect(sqlite_db_path)
-            conn.row_factory = sqlite3.Row
+            conn = get_sqlite_connection()
             cursor = conn.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.row_factory = sqlite3.Row
             cursor.execute(
-                "SELECT emp_id, password, name, department_name, can_login FROM users WHERE emp_id = ? AND password = ?",
-                (emp_id, password)
+                "SELECT emp_id, password, name, department_name, can_login FROM users WHERE emp_id = ?",
+                (emp_id,)
             )
             user = cursor.fetchone()
 
-            if user and user["can_login"] == 1:
+            if user and user["can_login"] == 1 and verify_password(password, user["password"]):
+                # Upgrades plaintext left by older syncs lazily, one hash per login instead of all users at startup
+                if password_needs_rehash(user["password"]):
+                    with conn:
+                        conn.execute("UPDATE users SET password = ? WHERE emp_id = ?", (hash_password(password), emp_id))
+                # Route guards read this session entry; nothing downstream goes back to the users table
                 page.session.set("user", {
                     "emp_id": user["emp_id"],
                     "can_login": user["can_login"],
                     "name": user["name"],
                     "department_name": user["department_name"]
                 })
-                # Initialize JobCardPage and sync job cards
-                job_card_page = JobCardPage(page)
-                page.views.append(ft.View("/jobcard", [job_card_page]))
+                # The route handler builds the job card page once for this session and syncs it on first load
                 page.go("/jobcard")
-                # Trigger sync after navigation
-                page.run_task(job_card_page.sync_from_mysql, None)
                 snack_bar.content.value = f"Login successful as {user['name']}. Syncing job cards..."
                 snack_bar.bgcolor = ft.Colors.TEAL_600
                 snack_bar.duration = 4000
@@ -248,7 +147,7 @@ def login_page(page: ft.Page):
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                release_sqlite_connection(conn)
             page.update()
 
     # Sync Users button
@@ -4,17 +4,75 @@ os.environ["FLET_SECRET_KEY"] = "mysecret123"
 import flet as ft
 import urllib.parse
 import asyncio
+import sqlite3
 from login import login_page
-from jobcard_client import JobCardPage
-from sidebar import TopBar
+from local_db import migrate_database
+from overlays import close_dialog, get_beep, get_snack_bar
 
 # Routing map with only login and jobcard routes
 def get_route_map(page):
+    # Imported on first navigation past login; pulls in the MySQL driver and the sync machinery
+    from jobcard_client import JobCardPage
     return {
         "/login": lambda: login_page(page),
-        "/jobcard": lambda: JobCardPage(page),
+        "/jobcard": lambda: JobCardPage(page, sync_on_load=True),
     }
 
+
+def clear_route_cache(page):
+    """Drop the views kept for the current user session."""
+    page.route_views = {}
+
+
+def get_route_view(page, route, content_builder):
+    """Return the view for a route, built on the first visit of the session and reused afterwards."""
+    route_views = getattr(page, "route_views", None)
+    if route_views is None:
+        route_views = page.route_views = {}
+    cached = route_views.get(route)
+    if cached:
+        view, top_bar, content = cached
+        page.top_bar_ref.current = top_bar
+        # Only the data is refreshed on re-entry; controls, subscriptions and overlays are kept
+        page.run_task(top_bar.refresh_job_count)
+        if hasattr(content, "on_enter"):
+            content.on_enter()
+        return view
+
+    from sidebar import TopBar
+    content = content_builder()
+    top_bar = TopBar(page, top_bar_ref=page.top_bar_ref)
+    page.top_bar_ref.current = top_bar
+    layout = ft.Column(
+        controls=[
+            ft.Container(content=top_bar.build()),
+            ft.Container(content=content, expand=True, padding=ft.padding.symmetric(horizontal=20))
+        ],
+        expand=True,
+        spacing=0
+    )
+    view = ft.View(
+        route=route,
+        controls=[layout],
+        padding=ft.padding.only(top=30),  # Add 30px top padding for mobile status bar
+        bgcolor=ft.Colors.WHITE
+    )
+    route_views[route] = (view, top_bar, content)
+    return view
+
+def start_background_services(page):
+    """Start the server probe and outbox uploader and preload the notification sound (blocking imports)."""
+    from connectivity import get_connectivity_monitor
+    from outbox import get_outbox_uploader
+    # Probe the server in the background so the first sync doesn't wait on it
+    get_connectivity_monitor()
+    # Deliver job cards queued in earlier sessions as soon as the server is reachable
+    get_outbox_uploader()
+    # Attach the notification sound so its asset is loaded before the first beep
+    get_beep(page)
+    page.update()
+
+
 # Main entry point for Flet app
 def main(page: ft.Page):
     page.title = "Job Card System"
@@ -26,8 +84,12 @@ def main(page: ft.Page):
     page.window.width = 400
     page.window.height = 700
     page.window.resizable = True
-    page.top_bar_ref = ft.Ref[TopBar]()
-
+    page.top_bar_ref = ft.Ref["TopBar"]()
+    # Create or upgrade the local schema once per process; pages assume it is current
+    try:
+        migrate_database()
+    except sqlite3.Error as e:
+        print(f"Error migrating local database: {e}")
     def on_resize(e):
         page.update()
 
@@ -41,15 +103,15 @@ def main(page: ft.Page):
     def on_route_change(e: ft.RouteChangeEvent):
         route = e.route
 
-        # Clear page state
+        # Clear page state; the shared dialog and snackbar stay in the overlay for reuse
         page.controls.clear()
-        if page.views and route != page.views[-1].route and any(isinstance(c, ft.AlertDialog) for c in page.overlay):
-            page.overlay.clear()
-        page.snack_bar = None
+        if page.views and route != page.views[-1].route:
+            close_dialog(page)
 
         protected_routes = ["/jobcard"]
         user = page.session.get("user")
         if route in protected_routes and (not user or not user.get('emp_id')):
+            clear_route_cache(page)
             page.views.clear()
             page.views.append(ft.View(
                 route="/login",
@@ -57,12 +119,17 @@ def main(page: ft.Page):
                 padding=ft.padding.only(top=30),  # Add 30px top padding for mobile status bar
                 bgcolor=ft.Colors.WHITE
             ))
-            page.snack_bar = ft.SnackBar(ft.Text("Session expired. Please log in again."), duration=4000)
-            page.snack_bar.open = True
+            snack_bar = get_snack_bar(page)
+            snack_bar.content.value = "Session expired. Please log in again."
+            snack_bar.bgcolor = ft.Colors.BLACK
+            snack_bar.duration = 4000
+            snack_bar.open = True
             page.update()
             return
 
         if route == "/login":
+            # Logging in again starts a new session with freshly built pages
+            clear_route_cache(page)
             page.views.clear()
             page.views.append(ft.View(
                 route="/login",
@@ -76,34 +143,22 @@ def main(page: ft.Page):
         route_map = get_route_map(page)
         content_builder = route_map.get(route)
         if content_builder is None:
-            content = ft.Text("404 - Page Not Found", color=ft.Colors.RED_600)
+            view = get_route_view(page, route, lambda: ft.Text("404 - Page Not Found", color=ft.Colors.RED_600))
         else:
-            content = content_builder()
-
-        top_bar = TopBar(page, top_bar_ref=page.top_bar_ref)
-        page.top_bar_ref.current = top_bar
-        layout = ft.Column(
-            controls=[
-                ft.Container(content=top_bar.build()),
-                ft.Container(content=content, expand=True, padding=ft.padding.symmetric(horizontal=20))
-            ],
-            expand=True,
-            spacing=0
-        )
+            view = get_route_view(page, route, content_builder)
 
-        page.views.clear()
-        page.views.append(ft.View(
-            route=route,
-            controls=[layout],
-            padding=ft.padding.only(top=30),  # Add 30px top padding for mobile status bar
-            bgcolor=ft.Colors.WHITE
-        ))
+        # Navigating to the route already shown only refreshes its data
+        if not (len(page.views) == 1 and page.views[0] is view):
+            page.views.clear()
+            page.views.append(view)
         page.update()
 
     page.on_resize = on_resize
     page.on_view_pop = view_pop
     page.on_route_change = on_route_change
     page.go("/login")
+    # Everything the login screen doesn't need starts after it has been requested
+    page.run_thread(start_background_services, page)
 
 temp_dir = os.path.join(os.getcwd(), "temp")
 os.makedirs(temp_dir, exist_ok=True)
@@ -0,0 +1,372 @@
+import sqlite3
+import threading
+import time
+import weakref
+import mysql.connector
+from connectivity import get_connectivity_monitor
+from db import get_mysql_connection, release_mysql_connection
+from job_sequences import JOB_NUMBER_PATTERN, advance_job_sequences, reserve_job_sequences
+from local_queries import (
+    OUTBOX_NEXT_DUE_SQL, OUTBOX_PRUNE_SQL, RENAME_JOB_CARD_SQL, RENAME_OUTBOX_JOB_CARD_SQL, outbox_batch_query
+)
+from local_db import get_device_id, get_sqlite_connection, release_sqlite_connection
+
+# Job cards inserted into MySQL per multi-row INSERT during upload
+UPLOAD_CHUNK_SIZE = 200
+
+# Outbox entries handed to one upload pass
+OUTBOX_BATCH_SIZE = 500
+
+# Seconds before a failed entry is retried, doubling per attempt up to the maximum
+OUTBOX_RETRY_BASE = 5
+OUTBOX_RETRY_MAX = 300
+
+# Seconds between checks for due entries while nothing else wakes the uploader
+OUTBOX_IDLE_INTERVAL = 60
+
+# Rounds of renumbering for cards whose id or number is taken on the server, per upload pass
+RENUMBER_ROUNDS = 3
+
+# Days delivered, duplicate and rejected entries are kept before they are pruned
+OUTBOX_KEEP_DAYS = 7
+
+
+def enqueue_job_card(conn, job_card_id):
+    """Record a locally created job card for upload; joins the caller's transaction."""
+    conn.execute(
+        "INSERT INTO outbox (operation, job_card_id, created_at) VALUES ('create_job_card', ?, ?)",
+        (job_card_id, time.time())
+    )
+
+
+def is_same_job_card(server_row, jc):
+    """Return whether a server row holding a card's id or number is that card, delivered by an earlier pass."""
+    _, _, title, created_date, department_name = server_row
+    if hasattr(created_date, "strftime"):
+        created_date = created_date.strftime('%Y-%m-%d %H:%M:%S')
+    return (title, created_date, department_name) == (jc['title'], jc['created_date'], jc['department_name'])
+
+
+def number_job_cards(cursor_mysql, job_cards, department_ids, result):
+    """Give cards fresh numbers and ids from the server counter; returns (card, job number, id) candidates."""
+    groups = {}  # (prefix, day) -> cards
+    for jc in job_cards:
+        match = JOB_NUMBER_PATTERN.match(jc['job_number'])
+        if match is None or jc['department_name'] not in department_ids:
+            result["failed"].append((jc['id'], jc['job_number']))
+            continue
+        groups.setdefault((match.group(1), match.group(2)), []).append(jc)
+    candidates = []
+    for (prefix, day), cards in groups.items():
+        start = reserve_job_sequences(cursor_mysql, prefix, day, len(cards))
+        for sequence, jc in enumerate(cards, start=start):
+            department_id = department_ids[jc['department_name']]
+            candidates.append((jc, f"{prefix}{day}-{sequence:04d}", int(f"{department_id}{day}{sequence:04d}")))
+    return candidates
+
+
+def adopt_server_identity(conn_sqlite, local_id, server_id, job_number):
+    """Give a delivered card its server id and number locally; joins the caller's transaction."""
+    try:
+        conn_sqlite.execute(RENAME_JOB_CARD_SQL, (server_id, job_number, local_id))
+        conn_sqlite.execute(RENAME_OUTBOX_JOB_CARD_SQL, (server_id, local_id))
+    except sqlite3.IntegrityError:
+        # A concurrent sync already pulled the server copy; the local one is redundant
+        conn_sqlite.execute("DELETE FROM job_cards WHERE id = ?", (local_id,))
+
+
+def upload_job_cards(conn_mysql, conn_sqlite, job_cards, device_id):
+    """Insert local job cards into MySQL in chunks and report the outcome as (local id, job number) pairs.
+
+    Cards numbered offline without a reserved number (-D<device> suffix) get a fresh number and id
+    from the server counter here, since their local ones may already have been issued elsewhere. So
+    does a card whose id or number turns out to belong to a different card on the server; only a
+    server row with the card's title, created date and department counts as already delivered.
+    """
+    result = {"uploaded": [], "skipped_duplicate": [], "rejected_too_long": [], "failed": []}
+    names = list({jc['department_name'] for jc in job_cards})
+    department_ids = dict(conn_sqlite.execute(
+        f"SELECT name, id FROM department WHERE name IN ({', '.join(['?'] * len(names))})", names
+    ))
+    cursor_mysql = conn_mysql.cursor()
+    try:
+        candidates = []  # (card, job number, id) as they will be stored on the server
+        renumber = []  # Cards to number from the server counter
+        for jc in job_cards:
+            origin_device = jc['origin_device'] or device_id
+            if JOB_NUMBER_PATTERN.match(jc['job_number']) and jc['job_number'].endswith(f"-D{origin_device}"):
+                renumber.append(jc)
+            else:
+                candidates.append((jc, jc['job_number'], jc['id']))
+
+        pending = []
+        local_ids = {}  # Server id -> local id, which differ for renumbered cards
+        claimed_ids = set()
+        claimed_job_numbers = set()
+        for _ in range(RENUMBER_ROUNDS):
+            if renumber:
+                candidates += number_job_cards(cursor_mysql, renumber, department_ids, result)
+                conn_mysql.commit()
+                renumber = []
+            result["rejected_too_long"].extend((jc['id'], job_number) for jc, job_number, _ in candidates if len(job_number) > 30)
+            candidates = [candidate for candidate in candidates if len(candidate[1]) <= 30]
+            if not candidates:
+                break
+
+            # One existence check for the whole batch instead of a SELECT per card
+            ids = [server_id for _, _, server_id in candidates]
+            job_numbers = [job_number for _, job_number, _ in candidates]
+            cursor_mysql.execute(
+                f"""
+                    SELECT id, job_number, title, created_date, department_name FROM job_cards
+                    WHERE id IN ({", ".join(["%s"] * len(ids))}) OR job_number IN ({", ".join(["%s"] * len(job_numbers))})
+                """,
+                ids + job_numbers
+            )
+            existing = cursor_mysql.fetchall()
+            existing_by_id = {row[0]: row for row in existing}
+            existing_by_job_number = {row[1]: row for row in existing}
+
+            with conn_sqlite:
+                for jc, job_number, server_id in candidates:
+                    conflicts = [row for row in (existing_by_id.get(server_id), existing_by_job_number.get(job_number)) if row]
+                    delivered = next((row for row in conflicts if is_same_job_card(row, jc)), None)
+                    if delivered:
+                        adopt_server_identity(conn_sqlite, jc['id'], delivered[0], delivered[1])
+                        result["skipped_duplicate"].append((jc['id'], delivered[1]))
+                    elif conflicts or server_id in claimed_ids or job_number in claimed_job_numbers:
+                        renumber.append(jc)
+                    else:
+                        claimed_ids.add(server_id)
+                        claimed_job_numbers.add(job_number)
+                        local_ids[server_id] = jc['id']
+                        pending.append((
+                            server_id, job_number, jc['title'], jc['description'], jc['status'], jc['created_date'],
+                            jc['started_date'], jc['completed_date'], jc['entity_type'], jc['entity_id'],
+                            jc['closure_details'], jc['department_name']
+                        ))
+            candidates = []
+            if not renumber:
+                break
+        # Still colliding after every round: leave them for the next pass
+        result["failed"].extend((jc['id'], jc['job_number']) for jc in renumber)
+
+        insert_sql = """
+            INSERT INTO job_cards (id, job_number, title, description, status, created_date, started_date,
+                                   completed_date, entity_type, entity_id, closure_details, department_name)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        for start in range(0, len(pending), UPLOAD_CHUNK_SIZE):
+            chunk = pending[start:start + UPLOAD_CHUNK_SIZE]
+            try:
+                cursor_mysql.executemany(insert_sql, chunk)
+                conn_mysql.commit()
+                uploaded = chunk
+            except mysql.connector.Error:
+                # Retry the failed chunk row by row so one bad card doesn't block the rest
+                conn_mysql.rollback()
+                uploaded = []
+                for row in chunk:
+                    try:
+                        cursor_mysql.execute(insert_sql, row)
+                        conn_mysql.commit()
+                        uploaded.append(row)
+                    except mysql.connector.Error as e:
+                        conn_mysql.rollback()
+                        if e.errno == 1406:
+                            result["rejected_too_long"].append((local_ids[row[0]], row[1]))
+                        else:
+                            # Includes a duplicate key taken since the existence check; the next pass compares contents
+                            result["failed"].append((local_ids[row[0]], row[1]))
+            if uploaded:
+                # Keep the server counters ahead of the numbers these offline cards took
+                advance_job_sequences(cursor_mysql, [row[1] for row in uploaded])
+                conn_mysql.commit()
+            with conn_sqlite:
+                for row in uploaded:
+                    adopt_server_identity(conn_sqlite, local_ids[row[0]], row[0], row[1])
+            result["uploaded"].extend((local_ids[row[0]], row[1]) for row in uploaded)
+    finally:
+        cursor_mysql.close()
+    return result
+
+
+class OutboxUploader:
+    """Background thread that delivers outbox entries to MySQL in batches, with per-entry exponential backoff."""
+
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE, retry_base=OUTBOX_RETRY_BASE, retry_max=OUTBOX_RETRY_MAX,
+                 idle_interval=OUTBOX_IDLE_INTERVAL):
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.idle_interval = idle_interval
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.drain_lock = threading.Lock()  # One upload pass at a time, background or manual
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.connectivity_ref = None
+
+    def request_drain(self):
+        """Ask the background thread to upload due entries now."""
+        self.wake_event.set()
+
+    def on_connectivity_change(self, online):
+        """Drain as soon as the server becomes reachable again."""
+        if online:
+            self.request_drain()
+
+    def subscribe(self, callback):
+        """Call callback(result) after every pass that delivered or failed anything; bound methods are held weakly."""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self.lock:
+            self.subscribers.append(ref)
+        return ref
+
+    def unsubscribe(self, ref):
+        """Remove a subscription returned by subscribe."""
+        with self.lock:
+            if ref in self.subscribers:
+                self.subscribers.remove(ref)
+
+    def notify(self, result):
+        """Hand a pass result to the live subscribers."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                self.unsubscribe(ref)
+                continue
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"Error notifying outbox subscriber: {e}")
+
+    def drain(self, force=False):
+        """Upload pending entries batch by batch and return the combined outcome (blocking).
+
+        force also sends entries still waiting out their backoff, for the manual Upload button.
+        MySQL connection errors propagate and leave the entries untouched for the next pass.
+        """
+        result = {"uploaded": [], "skipped_duplicate": [], "rejected_too_long": [], "failed": []}
+        with self.drain_lock:
+            conn_sqlite = get_sqlite_connection()
+            conn_mysql = None
+            mysql_broken = False
+            try:
+                now = time.time()
+                last_outbox_id = 0
+                while True:
+                    # Walk the queue by id so entries that fail in this pass aren't picked up again until the next one
+                    query, params = outbox_batch_query(last_outbox_id, now, self.batch_size, force)
+                    cursor_sqlite = conn_sqlite.cursor()
+                    cursor_sqlite.row_factory = sqlite3.Row
+                    cursor_sqlite.execute(query, params)
+                    entries = [dict(row) for row in cursor_sqlite.fetchall()]
+                    cursor_sqlite.close()
+                    if not entries:
+                        break
+                    last_outbox_id = entries[-1]["outbox_id"]
+                    if conn_mysql is None:
+                        conn_mysql = get_mysql_connection()
+                    batch = upload_job_cards(conn_mysql, conn_sqlite, entries, get_device_id())
+                    self.record_outcome(conn_sqlite, entries, batch, now)
+                    for key, values in batch.items():
+                        result[key].extend(values)
+                with conn_sqlite:
+                    conn_sqlite.execute(OUTBOX_PRUNE_SQL, (now - OUTBOX_KEEP_DAYS * 86400,))
+            except mysql.connector.Error:
+                mysql_broken = True
+                raise
+            finally:
+                release_sqlite_connection(conn_sqlite)
+                if conn_mysql:
+                    release_mysql_connection(conn_mysql, broken=mysql_broken)
+        if any(result.values()):
+            self.notify(result)
+        return result
+
+    def record_outcome(self, conn_sqlite, entries, batch, now):
+        """Mark delivered and permanently rejected entries, and push failed ones back with exponential backoff."""
+        outbox_ids = {entry["id"]: entry["outbox_id"] for entry in entries}
+        attempts = {entry["id"]: entry["attempts"] for entry in entries}
+        with conn_sqlite:
+            conn_sqlite.executemany(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL WHERE id = ?",
+                [(now, outbox_ids[job_card_id]) for job_card_id, _ in batch["uploaded"]]
+            )
+            # sent_at also dates these settled entries so they are pruned with the delivered ones
+            conn_sqlite.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, sent_at = ?, last_error = ? WHERE id = ?",
+                [("duplicate", now, "Already delivered", outbox_ids[job_card_id])
+                 for job_card_id, _ in batch["skipped_duplicate"]]
+                + [("rejected", now, "Job number too long", outbox_ids[job_card_id])
+                   for job_card_id, _ in batch["rejected_too_long"]]
+            )
+            conn_sqlite.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                [
+                    (now + min(self.retry_base * 2 ** attempts[job_card_id], self.retry_max), "Insert failed", outbox_ids[job_card_id])
+                    for job_card_id, _ in batch["failed"]
+                ]
+            )
+
+    def next_due_in(self):
+        """Seconds until the earliest pending entry is due, capped at the idle interval."""
+        conn = get_sqlite_connection()
+        try:
+            next_attempt_at = conn.execute(OUTBOX_NEXT_DUE_SQL).fetchone()[0]
+        finally:
+            release_sqlite_connection(conn)
+        if next_attempt_at is None:
+            return self.idle_interval
+        return min(max(next_attempt_at - time.time(), 1), self.idle_interval)
+
+    def start(self):
+        """Start the background upload thread if it is not running yet."""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.connectivity_ref = get_connectivity_monitor().subscribe(self.on_connectivity_change)
+            self.thread = threading.Thread(target=self.run, name="outbox-uploader", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the background upload thread after its current pass."""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def run(self):
+        """Upload loop executed on the background thread."""
+        failures = 0  # Consecutive passes that failed as a whole, for exponential backoff
+        while not self.stop_event.is_set():
+            # While offline only a connectivity change or a new entry wakes the thread early
+            delay = self.idle_interval
+            if get_connectivity_monitor().is_online():
+                try:
+                    self.drain()
+                    failures = 0
+                    delay = self.next_due_in()
+                except (sqlite3.Error, mysql.connector.Error) as e:
+                    print(f"Error uploading outbox: {e}")
+                    delay = min(self.retry_base * 2 ** failures, self.retry_max)
+                    failures += 1
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_outbox_uploader():
+    """Return the shared outbox uploader, starting its thread on first use."""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = OutboxUploader()
+            _uploader.start()
+        return _uploader
@@ -0,0 +1,94 @@
+import time
+import flet as ft
+
+# Notification sound, and the minimum seconds between two beeps so rapid actions don't stack them
+BEEP_SRC = "assets/beep.mp3"
+BEEP_MIN_INTERVAL = 0.5
+
+
+def overlay_control(page, key, factory):
+    """Return the page's shared overlay control for key, creating it once and keeping it attached to page.overlay."""
+    controls = getattr(page, "shared_overlays", None)
+    if controls is None:
+        controls = page.shared_overlays = {}
+    control = controls.get(key)
+    if control is None:
+        control = controls[key] = factory()
+    if control not in page.overlay:
+        page.overlay.append(control)
+    return control
+
+
+def build_snack_bar():
+    """Snackbar used for every status message; callers set content, colour and duration before opening it."""
+    return ft.SnackBar(
+        content=ft.Text("", size=14, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
+        bgcolor=ft.Colors.BLACK,
+        duration=4000,
+        show_close_icon=True,
+        behavior=ft.SnackBarBehavior.FLOATING,
+        width=340,
+        padding=10,
+        margin=ft.margin.only(bottom=10),
+        shape=ft.RoundedRectangleBorder(radius=8)
+    )
+
+
+def build_dialog():
+    """Modal dialog shell; callers swap in title, content and actions before opening it."""
+    return ft.AlertDialog(
+        modal=True,
+        actions_alignment=ft.MainAxisAlignment.END,
+        bgcolor=ft.Colors.BLUE_GREY_50,
+        shape=ft.RoundedRectangleBorder(radius=10)
+    )
+
+
+def build_beep():
+    """Notification sound player; STOP keeps the loaded asset after playback so it can be replayed."""
+    # Imported on first use so the login screen doesn't load the audio extension
+    from flet_audio import Audio
+    from flet_audio.audio import ReleaseMode
+    return Audio(src=BEEP_SRC, autoplay=False, release_mode=ReleaseMode.STOP)
+
+
+def get_snack_bar(page):
+    """Return the one snackbar shared by every view of this Flet page."""
+    return overlay_control(page, "snack_bar", build_snack_bar)
+
+
+def get_dialog(page):
+    """Return the one modal dialog shared by every view of this Flet page."""
+    return overlay_control(page, "dialog", build_dialog)
+
+
+def get_beep(page):
+    """Return the one notification sound player of this Flet page; called at startup so the asset preloads."""
+    return overlay_control(page, "beep", build_beep)
+
+
+def play_beep(page):
+    """Replay the notification sound from the start; returns False when skipped as too close to the last beep."""
+    now = time.monotonic()
+    if now - getattr(page, "beep_played_at", float("-inf")) < BEEP_MIN_INTERVAL:
+        return False
+    page.beep_played_at = now
+    controls = getattr(page, "shared_overlays", None) or {}
+    attached = controls.get("beep") in page.overlay
+    beep = get_beep(page)
+    if not attached:
+        # Methods can only be invoked on a control the client already knows about
+        page.update()
+    beep.seek(0)
+    beep.play()
+    return True
+
+
+def close_dialog(page):
+    """Close the shared dialog if it is open; it stays in the overlay for the next use."""
+    controls = getattr(page, "shared_overlays", None)
+    dialog = controls.get("dialog") if controls else None
+    if dialog is not None and dialog.open:
+        dialog.open = False
+        return True
+    return False
@@ -0,0 +1,74 @@
+"""One-off server migration: add the updated_at change markers that delta syncs follow.
+
+MySQL stamps updated_at on every insert and update, whichever client made the change. Handsets
+never alter the shared schema; until this has run they fall back to full pulls (see server_schema.py).
+Adding the column rebuilds the table, so run it in a maintenance window with an account allowed
+to ALTER the tables:
+
+    JOBCARD_SERVER_HOST=... JOBCARD_SERVER_USER=... JOBCARD_SERVER_PASSWORD=... \
+    JOBCARD_SERVER_DATABASE=... python server_migrations/add_change_tracking.py
+
+Safe to re-run; tables that are already tracked are left alone.
+"""
+import os
+import sys
+
+import mysql.connector
+
+COLUMN_DEFINITION = "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+
+# Table -> columns leading the updated_at index, matching the delta queries' equality filters
+TRACKED_TABLES = {
+    "job_cards": ["department_name"],
+    "users": [],
+}
+
+
+def text(value):
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
+
+
+def add_change_tracking(cursor, table, index_columns):
+    """Add or repair table.updated_at and its index; returns the statements it ran."""
+    statements = []
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE 'updated_at'")
+    column = cursor.fetchone()
+    if column is None:
+        statements.append(f"ALTER TABLE {table} ADD COLUMN updated_at {COLUMN_DEFINITION}")
+    elif text(column[2]) != "NO" or "on update current_timestamp" not in text(column[5]).lower():
+        # An existing column nothing maintains: stamp the gaps, then let MySQL keep it current
+        statements.append(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+        statements.append(f"ALTER TABLE {table} MODIFY COLUMN updated_at {COLUMN_DEFINITION}")
+    cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = 'idx_{table}_updated'")
+    if not cursor.fetchall():
+        statements.append(f"ALTER TABLE {table} ADD INDEX idx_{table}_updated ({', '.join(index_columns + ['updated_at'])})")
+    for statement in statements:
+        cursor.execute(statement)
+    return statements
+
+
+def main():
+    names = ["HOST", "USER", "PASSWORD", "DATABASE"]
+    missing = [f"JOBCARD_SERVER_{name}" for name in names if f"JOBCARD_SERVER_{name}" not in os.environ]
+    if missing:
+        sys.exit(f"Set {', '.join(missing)}; this script never falls back to the app's connection settings.")
+    conn = mysql.connector.connect(
+        host=os.environ["JOBCARD_SERVER_HOST"],
+        port=int(os.getenv("JOBCARD_SERVER_PORT", "3306")),
+        user=os.environ["JOBCARD_SERVER_USER"],
+        password=os.environ["JOBCARD_SERVER_PASSWORD"],
+        database=os.environ["JOBCARD_SERVER_DATABASE"],
+    )
+    cursor = conn.cursor()
+    try:
+        for table, index_columns in TRACKED_TABLES.items():
+            statements = add_change_tracking(cursor, table, index_columns)
+            conn.commit()
+            print(f"{table}: {'; '.join(statements) if statements else 'already tracked'}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
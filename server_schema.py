@@ -0,0 +1,24 @@
+_change_tracked_tables = set()
+
+
+def has_change_tracking(cursor, table):
+    """Return whether the server maintains table.updated_at, as added by server_migrations/add_change_tracking.py.
+
+    Clients only look; the shared schema is never altered from a handset. A column that exists
+    but isn't stamped ON UPDATE would miss edits, so it doesn't count. Only a positive answer is
+    cached, so a server migrated while the app runs is picked up on the next sync.
+    """
+    if table in _change_tracked_tables:
+        return True
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE 'updated_at'")
+    column = cursor.fetchone()
+    if column is None:
+        return False
+    extra = column["Extra"] if isinstance(column, dict) else column[5]
+    if isinstance(extra, (bytes, bytearray)):
+        extra = extra.decode()
+    if "on update current_timestamp" not in (extra or "").lower():
+        return False
+    _change_tracked_tables.add(table)
+    return True
+
@@ -1,6 +1,19 @@
 import flet as ft
-import mysql.connector
-from mysql.connector import Error
+import sqlite3
+from db import run_db
+from connectivity import get_connectivity_monitor
+from local_db import get_sqlite_connection, release_sqlite_connection
+from local_queries import OPEN_JOB_CARD_COUNT_SQL
+
+
+def count_open_job_cards(department_name):
+    """Count open job cards for a department in the local mirror (blocking, no network)."""
+    conn = get_sqlite_connection()
+    try:
+        return conn.execute(OPEN_JOB_CARD_COUNT_SQL, (department_name,)).fetchone()[0]
+    finally:
+        release_sqlite_connection(conn)
+
 
 class TopBar(ft.Container):
     def __init__(self, page: ft.Page, height=55, bg_color="#4682B4", top_bar_ref=None):
@@ -9,47 +22,48 @@ class TopBar(ft.Container):
         self.height = height
         self.bg_color = bg_color
         self.top_bar_ref = top_bar_ref
-        self.new_job_count = 0
+        # Last count seen on this page, so a freshly built bar shows it until the refresh lands
+        self.new_job_count = getattr(page, "open_job_count", 0)
         self.bell_icon_ref = ft.Ref[ft.Stack]()
+        self.offline_icon_ref = ft.Ref[ft.Icon]()
         # Safely access user department from session
         user = page.session.get("user")
         self.user_department = user.get("department_name", "") if isinstance(user, dict) else ""
+        get_connectivity_monitor().subscribe(self.on_connectivity_change)
+        self.page.run_task(self.refresh_job_count)
 
-    def get_new_job_count(self):
-        """Fetch count of open job cards for user's department from database."""
-        db_config = {
-            "host": "200.200.200.23",
-            "user": "root",
-            "password": "Pak@123",
-            "database": "asm_sys"
-        }
+    def on_connectivity_change(self, online):
+        """Show or hide the offline indicator when server reachability changes."""
+        if self.offline_icon_ref.current:
+            self.offline_icon_ref.current.visible = not online
+            try:
+                self.offline_icon_ref.current.update()
+            except Exception:
+                pass
+
+    async def refresh_job_count(self):
+        """Recount open job cards from SQLite off the event loop and update the badge."""
         try:
-            conn = mysql.connector.connect(**db_config)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM job_cards WHERE status = 'Open' AND department_name = %s", (self.user_department,))
-            count = cursor.fetchone()[0]
-            cursor.close()
-            conn.close()
-            return count
-        except Error as e:
-            print(f"Error fetching job card count: {e}")
-            return 0
+            count = await run_db(count_open_job_cards, self.user_department)
+        except sqlite3.Error as e:
+            print(f"Error counting job cards: {e}")
+            return
+        self.page.open_job_count = count
+        if count != self.new_job_count:
+            self.new_job_count = count
+            self.update_notification_icon()
 
     def update_notification_icon(self):
         """Update the bell icon with current job card count."""
-        self.new_job_count = self.get_new_job_count()
         if self.bell_icon_ref.current:
-            badge = ft.Container(
-                content=ft.Text(str(self.new_job_count), size=12, color=ft.Colors.WHITE),
-                width=20,
-                height=20,
-                bgcolor=ft.Colors.RED_600,
-                border_radius=10,
-                alignment=ft.alignment.center,
-                visible=self.new_job_count > 0
-            )
-            self.bell_icon_ref.current.controls[1] = badge
-            self.bell_icon_ref.current.update()
+            bell_button, badge = self.bell_icon_ref.current.controls
+            bell_button.tooltip = f"New Job Cards ({self.new_job_count})"
+            badge.content.value = str(self.new_job_count)
+            badge.visible = self.new_job_count > 0
+            try:
+                self.bell_icon_ref.current.update()
+            except Exception:
+                pass
 
     def handle_logout(self, e):
         print("Logging out")
@@ -62,8 +76,6 @@ class TopBar(ft.Container):
         user = self.page.session.get("user")
         user_name = user.get("name", "Guest") if isinstance(user, dict) else "Guest"
 
-        self.new_job_count = self.get_new_job_count()
-        
         user_menu = ft.PopupMenuButton(
             items=[
                 ft.PopupMenuItem(
@@ -130,6 +142,14 @@ class TopBar(ft.Container):
                         menubar,
                         ft.Container(expand=True),
                         ft.Row([
+                            ft.Icon(
+                                ref=self.offline_icon_ref,
+                                name=ft.Icons.CLOUD_OFF,
+                                color=ft.Colors.WHITE,
+                                size=20,
+                                tooltip="Server unreachable",
+                                visible=not get_connectivity_monitor().online
+                            ),
                             ft.Stack(
                                 ref=self.bell_icon_ref,
                                 controls=[
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from local_db import bulk_upsert
+from passwords import hash_passwords
+from server_schema import has_change_tracking
+
+DEPARTMENT_COLUMNS = ["id", "name", "description", "created_at", "updated_at"]
+USER_COLUMNS = ["emp_id", "password", "name", "department_name", "can_login", "server_updated_at"]
+
+# Seconds re-read before a watermark, for rows stamped before a slower transaction committed
+SYNC_LOOKBACK = 120
+
+
+def format_timestamp(value):
+    """Render a MySQL DATETIME the way the local tables store it."""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def watermark_since(watermark):
+    """Lower bound for a delta query: the stored watermark minus the lookback overlap."""
+    since = datetime.strptime(watermark, '%Y-%m-%d %H:%M:%S') - timedelta(seconds=SYNC_LOOKBACK)
+    return since.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def set_watermark(conn_sqlite, key, watermark):
+    """Store a delta sync watermark in app_settings."""
+    conn_sqlite.execute("""
+        INSERT INTO app_settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (key, watermark))
+
+
+def fetch_department_changes(conn_mysql, conn_sqlite):
+    """Read departments changed since the stored watermark plus the ids still on the server."""
+    row = conn_sqlite.execute("SELECT value FROM app_settings WHERE key = 'department_sync_watermark'").fetchone()
+    watermark = row[0] if row else None
+    cursor_mysql = conn_mysql.cursor(dictionary=True)
+    try:
+        # Re-reads a short overlap before the watermark; re-applying those rows is a no-op
+        if watermark:
+            cursor_mysql.execute(
+                "SELECT id, name, description, created_at, updated_at FROM department WHERE updated_at >= %s OR updated_at IS NULL",
+                (watermark_since(watermark),)
+            )
+        else:
+            cursor_mysql.execute("SELECT id, name, description, created_at, updated_at FROM department")
+        departments = cursor_mysql.fetchall()
+        cursor_mysql.execute("SELECT id FROM department")
+        server_ids = {row["id"] for row in cursor_mysql.fetchall()}
+    finally:
+        cursor_mysql.close()
+
+    rows = [
+        (dept["id"], dept["name"], dept["description"], format_timestamp(dept["created_at"]), format_timestamp(dept["updated_at"]))
+        for dept in departments
+    ]
+    local_rows = {
+        row[0]: row for row in conn_sqlite.execute(
+            f"SELECT {', '.join(DEPARTMENT_COLUMNS)} FROM department WHERE id IN ({', '.join(['?'] * len(rows))})",
+            [row[0] for row in rows]
+        )
+    } if rows else {}
+    return {
+        "rows": [row for row in rows if local_rows.get(row[0]) != row],
+        "server_ids": server_ids,
+        "watermark": max([watermark or ""] + [row[4] for row in rows if row[4]]) or None,
+    }
+
+
+def fetch_user_changes(conn_mysql, conn_sqlite):
+    """Read login-enabled users changed since the stored watermark, hashing only their passwords."""
+    row = conn_sqlite.execute("SELECT value FROM app_settings WHERE key = 'user_sync_watermark'").fetchone()
+    watermark = row[0] if row else None
+    local_versions = dict(conn_sqlite.execute("SELECT emp_id, server_updated_at FROM users"))
+    cursor_mysql = conn_mysql.cursor(dictionary=True)
+    try:
+        # Until the server migration adds users.updated_at every sync re-reads and re-hashes all users
+        tracked = has_change_tracking(cursor_mysql, "users")
+        query = f"SELECT emp_id, password, name, department_name, can_login{', updated_at' if tracked else ''} FROM users WHERE can_login = 1"
+        if tracked and watermark:
+            cursor_mysql.execute(query + " AND (updated_at >= %s OR updated_at IS NULL)", (watermark_since(watermark),))
+        else:
+            cursor_mysql.execute(query)
+        # Rows re-read from the lookback overlap that are already stored at this version are skipped
+        users = [user for user in cursor_mysql.fetchall()
+                 if user.get("updated_at") is None or local_versions.get(user["emp_id"]) != format_timestamp(user["updated_at"])]
+        cursor_mysql.execute("SELECT emp_id FROM users WHERE can_login = 1")
+        server_ids = {row["emp_id"] for row in cursor_mysql.fetchall()}
+    finally:
+        cursor_mysql.close()
+
+    # Hashing is the expensive part of a sync, so it only runs for users changed since the last one
+    password_hashes = hash_passwords([user["password"] or "" for user in users])
+    return {
+        "rows": [
+            (user["emp_id"], password_hash, user["name"], user["department_name"], user["can_login"],
+             format_timestamp(user.get("updated_at")))
+            for user, password_hash in zip(users, password_hashes)
+        ],
+        "new_ids": {user["emp_id"] for user in users if user["emp_id"] not in local_versions},
+        "removed_ids": [emp_id for emp_id in local_versions if emp_id not in server_ids],
+        "watermark": max([watermark or ""] + [format_timestamp(user["updated_at"]) for user in users if user.get("updated_at")]) or None,
+    }
+
+
+def apply_department_changes(conn_sqlite, changes):
+    """Upsert changed departments and advance the watermark when all of them were stored."""
+    failed_rows = bulk_upsert(conn_sqlite, "department", DEPARTMENT_COLUMNS, changes["rows"])
+    if changes["watermark"] and not failed_rows:
+        set_watermark(conn_sqlite, "department_sync_watermark", changes["watermark"])
+    return {"updated": len(changes["rows"]) - len(failed_rows), "failed": len(failed_rows)}
+
+
+def prune_departments(conn_sqlite, server_ids):
+    """Delete local departments gone from the server; ones still referenced locally are kept."""
+    local_ids = [row[0] for row in conn_sqlite.execute("SELECT id FROM department")]
+    removed_ids = [(dept_id,) for dept_id in local_ids if dept_id not in server_ids]
+    before = conn_sqlite.total_changes
+    conn_sqlite.executemany("""
+        DELETE FROM department
+        WHERE id = ?
+          AND NOT EXISTS (SELECT 1 FROM users WHERE users.department_name = department.name)
+          AND NOT EXISTS (SELECT 1 FROM job_cards WHERE job_cards.department_name = department.name)
+    """, removed_ids)
+    return conn_sqlite.total_changes - before
+
+
+def apply_user_changes(conn_sqlite, changes):
+    """Upsert changed users and delete the ones that lost login rights or left the server."""
+    failed_rows = bulk_upsert(conn_sqlite, "users", USER_COLUMNS, changes["rows"], key_columns=("emp_id",))
+    conn_sqlite.executemany("DELETE FROM users WHERE emp_id = ?", [(emp_id,) for emp_id in changes["removed_ids"]])
+    if changes["watermark"] and not failed_rows:
+        set_watermark(conn_sqlite, "user_sync_watermark", changes["watermark"])
+    failed_ids = {row[0] for row in failed_rows}
+    added = len(changes["new_ids"] - failed_ids)
+    return {
+        "added": added,
+        "updated": len(changes["rows"]) - len(failed_rows) - added,
+        "removed": len(changes["removed_ids"]),
+        "failed": len(failed_rows),
+    }
+
+
+def sync_departments(conn_mysql, conn_sqlite):
+    """Bring the local department table up to date in one transaction; returns the change counts."""
+    changes = fetch_department_changes(conn_mysql, conn_sqlite)
+    # Explicit BEGIN: bulk_upsert's savepoint would otherwise commit on its own when released
+    conn_sqlite.execute("BEGIN")
+    with conn_sqlite:
+        counts = apply_department_changes(conn_sqlite, changes)
+        counts["removed"] = prune_departments(conn_sqlite, changes["server_ids"])
+    return counts
+
+
+def sync_directory(conn_mysql, conn_sqlite):
+    """Apply department and user changes from MySQL in one transaction; returns the change counts.
+
+    Everything is read and hashed before the write transaction starts, so the local database
+    is only locked for the writes themselves.
+    """
+    department_changes = fetch_department_changes(conn_mysql, conn_sqlite)
+    user_changes = fetch_user_changes(conn_mysql, conn_sqlite)
+    # Explicit BEGIN: bulk_upsert's savepoint would otherwise commit on its own when released
+    conn_sqlite.execute("BEGIN")
+    with conn_sqlite:
+        # Departments first so new users can reference them, pruning last so removed users no longer hold them
+        department_counts = apply_department_changes(conn_sqlite, department_changes)
+        user_counts = apply_user_changes(conn_sqlite, user_changes)
+        department_counts["removed"] = prune_departments(conn_sqlite, department_changes["server_ids"])
+    return {"departments": department_counts, "users": user_counts}